@@ -0,0 +1,32 @@
+"""Refresh tokens active index
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2024-02-20 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Partial index for revoking a user's live tokens
+    op.create_index(
+        "ix_refresh_tokens_user_active",
+        "refresh_tokens",
+        ["user_id"],
+        postgresql_where=sa.text("NOT revoked"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_refresh_tokens_user_active", table_name="refresh_tokens")
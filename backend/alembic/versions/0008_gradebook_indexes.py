@@ -0,0 +1,44 @@
+"""Gradebook indexes
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2024-02-20 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Covering index for the v_gradebook score lookup
+    op.create_index(
+        "ix_assignment_student_student_assignment",
+        "assignment_student",
+        ["student_id", "assignment_id"],
+        postgresql_include=["score"],
+    )
+
+    # Active enrolments per course
+    op.create_index(
+        "ix_enrolments_course_user_active",
+        "enrolments",
+        ["course_id", "user_id"],
+        postgresql_where=sa.text("status = 'active'"),
+    )
+
+
+def downgrade() -> None:
+    # Drop indexes
+    op.drop_index("ix_enrolments_course_user_active", table_name="enrolments")
+    op.drop_index(
+        "ix_assignment_student_student_assignment", table_name="assignment_student"
+    )
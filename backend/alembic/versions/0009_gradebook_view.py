@@ -0,0 +1,51 @@
+"""Gradebook view without cross join
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2024-02-20 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Drive the gradebook view from active enrolments
+    op.execute("""
+    CREATE OR REPLACE VIEW v_gradebook AS
+    SELECT
+        a.course_id,
+        e.user_id as student_id,
+        a.id as assignment_id,
+        as2.score
+    FROM enrolments e
+    JOIN assignments a ON a.course_id = e.course_id
+    LEFT JOIN assignment_student as2 ON as2.assignment_id = a.id AND as2.student_id = e.user_id
+    WHERE e.status = 'active'
+    """)
+
+
+def downgrade() -> None:
+    # Restore the original gradebook view
+    op.execute("""
+    CREATE OR REPLACE VIEW v_gradebook AS
+    SELECT 
+        a.course_id,
+        u.id as student_id,
+        a.id as assignment_id,
+        as2.score
+    FROM assignments a
+    CROSS JOIN users u
+    LEFT JOIN assignment_student as2 ON as2.assignment_id = a.id AND as2.student_id = u.id
+    JOIN enrolments e ON e.user_id = u.id AND e.course_id = a.course_id
+    WHERE e.status = 'active'
+    """)
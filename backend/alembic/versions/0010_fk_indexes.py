@@ -0,0 +1,43 @@
+"""Foreign key indexes
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2024-02-20 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# FK columns not covered by the leading column of an existing index
+# (messages.dialog_id, notifications.user_id, course_roles.course_id and
+# assignment_student.student_id already are)
+FK_INDEXES = [
+    ("ix_dialogs_teacher_id", "dialogs", "teacher_id"),
+    ("ix_dialogs_student_id", "dialogs", "student_id"),
+    ("ix_messages_sender_id", "messages", "sender_id"),
+    ("ix_materials_course_id", "materials", "course_id"),
+    ("ix_materials_uploader_id", "materials", "uploader_id"),
+    ("ix_assignments_course_id", "assignments", "course_id"),
+    ("ix_course_roles_user_id", "course_roles", "user_id"),
+]
+
+
+def upgrade() -> None:
+    # Add indexes
+    for name, table, column in FK_INDEXES:
+        op.create_index(name, table, [column])
+
+
+def downgrade() -> None:
+    # Drop indexes
+    for name, table, _ in reversed(FK_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,39 @@
+"""Single admin
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2024-02-20 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0011"
+down_revision: Union[str, None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Seed the admin role so its id is known to the index predicate
+    op.execute("INSERT INTO roles (name) VALUES ('admin') ON CONFLICT (name) DO NOTHING")
+    admin_role_id = op.get_bind().execute(
+        sa.text("SELECT id FROM roles WHERE name = 'admin'")
+    ).scalar_one()
+
+    # Allow at most one admin, closing the register race
+    op.create_index(
+        "ix_one_admin",
+        "user_roles",
+        ["role_id"],
+        unique=True,
+        postgresql_where=sa.text(f"role_id = {int(admin_role_id)}"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_one_admin", table_name="user_roles")
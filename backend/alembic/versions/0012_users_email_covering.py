@@ -0,0 +1,36 @@
+"""Users email covering index
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2024-02-20 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0012"
+down_revision: Union[str, None] = "0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Replace the plain unique constraint with a covering unique index so
+    # login reads the hash and active flag from the index
+    op.create_index(
+        "uq_users_email",
+        "users",
+        ["email"],
+        unique=True,
+        postgresql_include=["password_hash", "is_active"],
+    )
+    op.drop_constraint("users_email_key", "users", type_="unique")
+
+
+def downgrade() -> None:
+    op.create_unique_constraint("users_email_key", "users", ["email"])
+    op.drop_index("uq_users_email", table_name="users")
@@ -0,0 +1,33 @@
+"""Refresh tokens token active index
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2024-02-20 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0013"
+down_revision: Union[str, None] = "0012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Lookup index over live tokens only
+    op.create_index(
+        "ix_refresh_tokens_token_active",
+        "refresh_tokens",
+        ["token"],
+        unique=True,
+        postgresql_where=sa.text("revoked = false"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_refresh_tokens_token_active", table_name="refresh_tokens")
@@ -0,0 +1,49 @@
+"""Materials keyset index
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2024-02-21 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0014"
+down_revision: Union[str, None] = "0013"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keyset pagination index, supersedes the plain course_id index
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_materials_course_id_desc",
+            "materials",
+            ["course_id", sa.text("id DESC")],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_materials_course_id",
+            table_name="materials",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_materials_course_id",
+            "materials",
+            ["course_id"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_materials_course_id_desc",
+            table_name="materials",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,27 @@
+"""Materials sha256 index
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2024-02-21 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0015"
+down_revision: Union[str, None] = "0014"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Content-addressed lookup of stored blobs
+    op.create_index("ix_materials_sha256", "materials", ["sha256"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_materials_sha256", table_name="materials")
@@ -0,0 +1,31 @@
+"""Drop duplicate course_roles lookup index
+
+Revision ID: 0016
+Revises: 0015
+Create Date: 2024-02-22 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0016"
+down_revision: Union[str, None] = "0015"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # uq_course_roles_course_user already backs (course_id, user_id) lookups
+    op.drop_index("ix_course_roles_course_user", table_name="course_roles")
+
+
+def downgrade() -> None:
+    op.create_index(
+        "ix_course_roles_course_user",
+        "course_roles",
+        ["course_id", "user_id"],
+    )
@@ -0,0 +1,55 @@
+"""Server-side timestamps
+
+Revision ID: 0017
+Revises: 0016
+Create Date: 2024-02-22 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0017"
+down_revision: Union[str, None] = "0016"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Timestamp columns that used Python-side utcnow defaults or naive types
+TIMESTAMP_COLUMNS = [
+    ("course_roles", "created_at"),
+    ("course_roles", "updated_at"),
+    ("dialogs", "created_at"),
+    ("dialogs", "updated_at"),
+    ("messages", "created_at"),
+    ("notifications", "created_at"),
+    ("assignments", "created_at"),
+    ("assignments", "updated_at"),
+]
+
+
+def upgrade() -> None:
+    # Existing values were written as naive UTC
+    for table, column in TIMESTAMP_COLUMNS:
+        op.alter_column(
+            table,
+            column,
+            type_=sa.DateTime(timezone=True),
+            postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+            server_default=sa.text("now()"),
+            existing_nullable=False,
+        )
+
+
+def downgrade() -> None:
+    for table, column in TIMESTAMP_COLUMNS:
+        op.alter_column(
+            table,
+            column,
+            type_=sa.DateTime(),
+            postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+            server_default=None,
+            existing_nullable=False,
+        )
@@ -0,0 +1,37 @@
+"""Messages and notifications updated_at
+
+Revision ID: 0018
+Revises: 0017
+Create Date: 2024-02-22 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0018"
+down_revision: Union[str, None] = "0017"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Both models now inherit updated_at from the shared Base
+    for table in ("messages", "notifications"):
+        op.add_column(
+            table,
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.text("now()"),
+                nullable=False,
+            ),
+        )
+
+
+def downgrade() -> None:
+    for table in ("messages", "notifications"):
+        op.drop_column(table, "updated_at")
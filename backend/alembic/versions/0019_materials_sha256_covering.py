@@ -0,0 +1,34 @@
+"""Materials sha256 covering index
+
+Revision ID: 0019
+Revises: 0018
+Create Date: 2024-02-23 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0019"
+down_revision: Union[str, None] = "0018"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Duplicate probe reads course_id and stored_path straight from the index
+    op.create_index(
+        "ix_materials_sha256_course",
+        "materials",
+        ["sha256", "course_id"],
+        postgresql_include=["stored_path"],
+    )
+    op.drop_index("ix_materials_sha256", table_name="materials")
+
+
+def downgrade() -> None:
+    op.create_index("ix_materials_sha256", "materials", ["sha256"])
+    op.drop_index("ix_materials_sha256_course", table_name="materials")
@@ -0,0 +1,62 @@
+"""Materials page covering index
+
+Revision ID: 0020
+Revises: 0019
+Create Date: 2024-02-23 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0020"
+down_revision: Union[str, None] = "0019"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Columns list_materials loads for each page entry
+PAGE_COLUMNS = [
+    "uploader_id",
+    "filename",
+    "mime_type",
+    "size",
+    "stored_path",
+    "sha256",
+    "created_at",
+    "updated_at",
+]
+
+
+def upgrade() -> None:
+    # Serve material pages with an index-only scan
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_materials_course_page",
+            "materials",
+            ["course_id", sa.text("id DESC")],
+            postgresql_include=PAGE_COLUMNS,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_materials_course_id_desc",
+            table_name="materials",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_materials_course_id_desc",
+            "materials",
+            ["course_id", sa.text("id DESC")],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_materials_course_page",
+            table_name="materials",
+            postgresql_concurrently=True,
+        )
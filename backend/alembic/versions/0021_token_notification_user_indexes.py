@@ -0,0 +1,46 @@
+"""Token and notification user indexes
+
+Revision ID: 0021
+Revises: 0020
+Create Date: 2024-02-24 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0021"
+down_revision: Union[str, None] = "0020"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# ix_refresh_tokens_user_active only covers live tokens, so cascades from
+# users still need a full index on refresh_tokens.user_id
+FK_INDEXES = [
+    ("ix_refresh_tokens_user_id", "refresh_tokens", "user_id"),
+    ("ix_telegram_tokens_user_id", "telegram_tokens", "user_id"),
+]
+
+
+def upgrade() -> None:
+    # Add indexes
+    for name, table, column in FK_INDEXES:
+        op.create_index(name, table, [column])
+
+    # Partial index for fetching a user's pending notifications
+    op.create_index(
+        "ix_notifications_user_undelivered",
+        "notifications",
+        ["user_id"],
+        postgresql_where=sa.text("NOT delivered"),
+    )
+
+
+def downgrade() -> None:
+    # Drop indexes
+    op.drop_index("ix_notifications_user_undelivered", table_name="notifications")
+    for name, table, _ in reversed(FK_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,42 @@
+"""Notifications payload jsonb
+
+Revision ID: 0022
+Revises: 0021
+Create Date: 2024-02-24 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0022"
+down_revision: Union[str, None] = "0021"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Store payloads as binary JSON
+    op.alter_column(
+        "notifications",
+        "payload",
+        type_=postgresql.JSONB(),
+        existing_type=sa.JSON(),
+        existing_nullable=False,
+        postgresql_using="payload::jsonb",
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        "notifications",
+        "payload",
+        type_=sa.JSON(),
+        existing_type=postgresql.JSONB(),
+        existing_nullable=False,
+        postgresql_using="payload::json",
+    )
@@ -0,0 +1,45 @@
+"""Assignment student timestamptz
+
+Revision ID: 0023
+Revises: 0022
+Create Date: 2024-02-24 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0023"
+down_revision: Union[str, None] = "0022"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ["created_at", "updated_at"]
+
+
+def upgrade() -> None:
+    # Existing values were written as naive UTC
+    for column in COLUMNS:
+        op.alter_column(
+            "assignment_student",
+            column,
+            type_=sa.DateTime(timezone=True),
+            postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+            existing_server_default=sa.text("now()"),
+            existing_nullable=False,
+        )
+
+
+def downgrade() -> None:
+    for column in COLUMNS:
+        op.alter_column(
+            "assignment_student",
+            column,
+            type_=sa.DateTime(),
+            postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+            existing_server_default=sa.text("now()"),
+            existing_nullable=False,
+        )
@@ -0,0 +1,44 @@
+"""Users telegram id and unread messages indexes
+
+Revision ID: 0024
+Revises: 0023
+Create Date: 2024-02-25 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0024"
+down_revision: Union[str, None] = "0023"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Column the Telegram bot binds accounts to
+    op.add_column("users", sa.Column("telegram_id", sa.BigInteger(), nullable=True))
+    op.create_index(
+        "ix_users_telegram_id",
+        "users",
+        ["telegram_id"],
+        unique=True,
+        postgresql_where=sa.text("telegram_id IS NOT NULL"),
+    )
+
+    # Partial index for marking a dialog's unread messages as read
+    op.create_index(
+        "ix_messages_unread",
+        "messages",
+        ["dialog_id", "sender_id"],
+        postgresql_where=sa.text("NOT read"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_messages_unread", table_name="messages")
+    op.drop_index("ix_users_telegram_id", table_name="users")
+    op.drop_column("users", "telegram_id")
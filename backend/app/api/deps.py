@@ -1,55 +1,87 @@
 from __future__ import annotations
 
-from typing import Annotated, AsyncGenerator, Generator, Optional
+import time
+from functools import lru_cache
+from typing import Annotated
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from sqlalchemy import select
+import jwt
+from jwt import PyJWTError as JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import Session
-from pydantic import ValidationError
+from sqlalchemy.orm import raiseload, selectinload
 
-from app.core.config import get_settings
-from app.core.security import verify_password
-from app.db.session import get_db, SessionLocal
+from app import crud
+from app.core.config import settings
+from app.db.session import get_db
+from app.models.course_role import CourseRole, CourseRoleEnum
 from app.models.user import User
 from app.schemas.user import TokenPayload
-from app import crud, models, schemas
-from app.models.course_role import CourseRoleEnum
 
-settings = get_settings()
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+JWT_SECRET_KEY = settings.SECRET_KEY
+JWT_ALGORITHMS = (settings.ALGORITHM,)
 
-reusable_oauth2 = OAuth2PasswordBearer(
-    tokenUrl=f"{settings.API_V1_STR}/login/access-token"
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
 )
 
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+
+# Decoded tokens: token -> (user_id, exp), plus a reverse index for logout
+TOKEN_CACHE_MAXSIZE = 10_000
+TOKEN_CACHE_TTL = 60
+_token_cache: dict[str, tuple[int, float]] = {}
+_user_tokens: dict[int, set[str]] = {}
+
+
+def _cache_token(token: str, user_id: int, exp: float) -> None:
+    """Remember a decoded token until it expires."""
+    if len(_token_cache) >= TOKEN_CACHE_MAXSIZE:
+        oldest = next(iter(_token_cache))
+        old_user_id, _ = _token_cache.pop(oldest)
+        _user_tokens.get(old_user_id, set()).discard(oldest)
+    _token_cache[token] = (user_id, min(exp, time.time() + TOKEN_CACHE_TTL))
+    _user_tokens.setdefault(user_id, set()).add(token)
+
+
+def invalidate_user_tokens(user_id: int) -> None:
+    """Drop all cached tokens of a user."""
+    for token in _user_tokens.pop(user_id, set()):
+        _token_cache.pop(token, None)
+
+
 async def get_current_user(
     db: Annotated[AsyncSession, Depends(get_db)],
     token: Annotated[str, Depends(oauth2_scheme)],
 ) -> User:
     """Get current user from token."""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
+    cached = _token_cache.get(token)
+    if cached is not None and cached[1] > time.time():
+        user_id = cached[0]
+    else:
+        if cached is not None:
+            _token_cache.pop(token, None)
+        try:
+            payload = jwt.decode(
+                token,
+                JWT_SECRET_KEY,
+                algorithms=JWT_ALGORITHMS,
+            )
+            token_data = TokenPayload(**payload)
+        except JWTError:
+            raise credentials_exception
+        if token_data.sub is None:
+            raise credentials_exception
+        user_id = int(token_data.sub)
+        _cache_token(token, user_id, float(payload["exp"]))
+
+    # Anything beyond roles must be loaded explicitly
+    user = await db.get(
+        User, user_id, options=[selectinload(User.roles), raiseload("*")]
     )
-    try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM],
-        )
-        token_data = TokenPayload(**payload)
-    except JWTError:
-        raise credentials_exception
-    if token_data.sub is None:
-        raise credentials_exception
-
-    result = await db.execute(select(User).where(User.id == int(token_data.sub)))
-    user = result.scalar_one_or_none()
     if user is None:
         raise credentials_exception
     if not user.is_active:
@@ -59,13 +91,14 @@ async def get_current_user(
         )
     return user
 
+@lru_cache
 def require_role(*allowed: str):
     """Require role decorator."""
 
     async def guard(
         user: Annotated[User, Depends(get_current_user)],
     ) -> User:
-        if not any(r.name in allowed for r in user.roles):
+        if user.role_names.isdisjoint(allowed):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not enough permissions",
@@ -74,86 +107,50 @@ def require_role(*allowed: str):
 
     return guard
 
-def get_db() -> Generator:
-    try:
-        db = SessionLocal()
-        yield db
-    finally:
-        db.close()
-
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
-) -> models.User:
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
-        token_data = schemas.TokenPayload(**payload)
-    except (jwt.JWTError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        )
-    user = crud.user.get(db, id=token_data.sub)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
-def get_current_active_user(
-    current_user: models.User = Depends(get_current_user),
-) -> models.User:
-    if not crud.user.is_active(current_user):
-        raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
-
-def get_current_active_superuser(
-    current_user: models.User = Depends(get_current_user),
-) -> models.User:
-    if not crud.user.is_superuser(current_user):
-        raise HTTPException(
-            status_code=400, detail="The user doesn't have enough privileges"
-        )
-    return current_user
-
-def require_course_role(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
-    course_id: int = None,
-    required_role: CourseRoleEnum = None,
-) -> models.CourseRole:
-    """
-    Dependency to check if the current user has the required role in a course.
-    Returns the course role if the user has the required role or higher.
-    """
-    if not course_id or not required_role:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Course ID and required role must be provided",
-        )
-
-    # Get the user's role in the course
-    course_role = crud.course_role.get_by_course_and_user(
-        db, course_id=course_id, user_id=current_user.id
+# Course role hierarchy
+COURSE_ROLE_RANK = {
+    CourseRoleEnum.OWNER: 3,
+    CourseRoleEnum.TEACHER: 2,
+    CourseRoleEnum.ASSISTANT: 1,
+}
+
+
+@lru_cache
+def require_course_role(required_role: CourseRoleEnum):
+    """Require course role dependency."""
+    sufficient = frozenset(
+        role
+        for role, rank in COURSE_ROLE_RANK.items()
+        if rank >= COURSE_ROLE_RANK[required_role]
     )
 
-    if not course_role:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="User does not have any role in this course",
-        )
-
-    # Define role hierarchy
-    role_hierarchy = {
-        CourseRoleEnum.OWNER: 3,
-        CourseRoleEnum.TEACHER: 2,
-        CourseRoleEnum.ASSISTANT: 1,
-    }
+    async def guard(
+        request: Request,
+        course_id: int,
+        db: Annotated[AsyncSession, Depends(get_db)],
+        current_user: Annotated[User, Depends(get_current_user)],
+    ) -> CourseRole:
+        # Reuse a role already resolved for this request
+        course_role = getattr(request.state, "course_role", None)
+        if course_role is None or course_role.course_id != course_id:
+            # Get the user's role in the course
+            course_role = await crud.course_role.get_by_course_and_user(
+                db, course_id=course_id, user_id=current_user.id
+            )
+            if not course_role:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="User does not have any role in this course",
+                )
+            request.state.course_role = course_role
+
+        # Check if user's role is sufficient
+        if course_role.role not in sufficient:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"User must have {required_role} role or higher",
+            )
 
-    # Check if user's role is sufficient
-    if role_hierarchy[course_role.role] < role_hierarchy[required_role]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail=f"User must have {required_role} role or higher",
-        )
+        return course_role
 
-    return course_role 
\ No newline at end of file
+    return guard
@@ -5,20 +5,26 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy import select
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, invalidate_user_tokens
+from app.core.config import settings
 from app.core.security import (
     create_access_token,
     create_refresh_token,
-    get_password_hash,
-    verify_password,
+    aget_password_hash,
+    averify_password,
+    password_needs_rehash,
 )
 from app.db.session import get_db
 from app.models.refresh_token import RefreshToken
 from app.models.role import Role
 from app.models.user import User
+from app.models.user_role import UserRole
 from app.schemas.user import Token, User as UserSchema, UserCreate
 
 router = APIRouter()
@@ -32,17 +38,19 @@ async def register(
 ) -> User:
     """Register new user."""
     # Check if any admin exists
-    result = await db.execute(select(Role).where(Role.name == "admin"))
-    admin_role = result.scalar_one_or_none()
-    if admin_role:
-        result = await db.execute(
-            select(User).join(User.roles).where(Role.name == "admin")
+    admin_exists = (
+        select(UserRole.user_id).where(UserRole.role_id == Role.id).exists()
+    )
+    result = await db.execute(
+        select(Role, admin_exists.label("admin_exists")).where(Role.name == "admin")
+    )
+    row = result.one_or_none()
+    admin_role = row.Role if row else None
+    if row and row.admin_exists:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Registration is closed",
         )
-        if result.scalar_one_or_none():
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Registration is closed",
-            )
 
     # Check if user exists
     result = await db.execute(select(User).where(User.email == user_in.email))
@@ -52,23 +60,43 @@ async def register(
             detail="Email already registered",
         )
 
+    # Ensure admin role
+    if not admin_role:
+        try:
+            async with db.begin_nested():
+                admin_role = await db.scalar(
+                    insert(Role).values(name="admin").returning(Role)
+                )
+        except IntegrityError:
+            admin_role = await db.scalar(select(Role).where(Role.name == "admin"))
+
     # Create user
-    user = User(
-        email=user_in.email,
-        first_name=user_in.first_name,
-        last_name=user_in.last_name,
-        password_hash=get_password_hash(user_in.password),
+    password_hash = await aget_password_hash(user_in.password)
+    user = await db.scalar(
+        insert(User)
+        .values(
+            email=user_in.email,
+            first_name=user_in.first_name,
+            last_name=user_in.last_name,
+            password_hash=password_hash,
+        )
+        .returning(User)
     )
 
     # Assign role
-    if not admin_role:
-        admin_role = Role(name="admin")
-        db.add(admin_role)
-    user.roles.append(admin_role)
-
-    db.add(user)
-    await db.commit()
-    await db.refresh(user)
+    try:
+        await db.execute(
+            insert(UserRole).values(user_id=user.id, role_id=admin_role.id)
+        )
+        await db.commit()
+    except IntegrityError:
+        # A concurrent registration claimed the admin role first
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Registration is closed",
+        )
+    set_committed_value(user, "roles", [admin_role])
     return user
 
 
@@ -81,33 +109,42 @@ async def login(
     """Login user and return access token."""
     # Get user
     result = await db.execute(
-        select(User).where(User.email == form_data.username)
+        select(User)
+        .options(selectinload(User.roles))
+        .where(User.email == form_data.username)
     )
     user = result.scalar_one_or_none()
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await averify_password(
+        form_data.password, user.password_hash
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Upgrade hashes made with outdated parameters
+    if password_needs_rehash(user.password_hash):
+        user.password_hash = await aget_password_hash(form_data.password)
+
     # Create access token
-    access_token = create_access_token(
-        data={"sub": user.email, "roles": [r.name for r in user.roles]}
-    )
+    access_token = create_access_token(user.id, roles=sorted(user.role_names))
 
     # Create refresh token
-    refresh_token = RefreshToken(
-        user_id=user.id,
-        expires_at=datetime.utcnow() + timedelta(days=30),
+    refresh_token = create_refresh_token(user.id)
+    db.add(
+        RefreshToken(
+            user_id=user.id,
+            token=refresh_token,
+            expires_at=datetime.utcnow()
+            + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        )
     )
-    db.add(refresh_token)
     await db.commit()
-    await db.refresh(refresh_token)
 
     return Token(
         access_token=access_token,
-        refresh_token=refresh_token.token,
+        refresh_token=refresh_token,
         token_type="bearer",
     )
 
@@ -120,16 +157,17 @@ async def logout(
 ) -> dict[str, str]:
     """Logout user and revoke refresh token."""
     # Revoke all refresh tokens for the user
-    result = await db.execute(
-        select(RefreshToken).where(
+    await db.execute(
+        update(RefreshToken)
+        .where(
             RefreshToken.user_id == current_user.id,
-            RefreshToken.revoked_at.is_(None),
+            RefreshToken.revoked.is_(False),
         )
+        .values(revoked=True)
+        .execution_options(synchronize_session=False)
     )
-    tokens = result.scalars().all()
-    for token in tokens:
-        token.revoked_at = datetime.utcnow()
     await db.commit()
+    invalidate_user_tokens(current_user.id)
 
     return {"message": "Successfully logged out"}
 
@@ -143,21 +181,24 @@ async def refresh_token(
     """Refresh access token."""
     # Create new access token
     access_token = create_access_token(
-        data={"sub": current_user.email, "roles": [r.name for r in current_user.roles]}
+        current_user.id, roles=sorted(current_user.role_names)
     )
 
     # Create new refresh token
-    refresh_token = RefreshToken(
-        user_id=current_user.id,
-        expires_at=datetime.utcnow() + timedelta(days=30),
+    refresh_token = create_refresh_token(current_user.id)
+    db.add(
+        RefreshToken(
+            user_id=current_user.id,
+            token=refresh_token,
+            expires_at=datetime.utcnow()
+            + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        )
     )
-    db.add(refresh_token)
     await db.commit()
-    await db.refresh(refresh_token)
 
     return Token(
         access_token=access_token,
-        refresh_token=refresh_token.token,
+        refresh_token=refresh_token,
         token_type="bearer",
     )
 
@@ -1,19 +1,24 @@
 from __future__ import annotations
 
-import hashlib
-import hmac
-import os
-import time
-import uuid
 from datetime import datetime, timedelta
-from typing import Annotated, Optional
+from typing import Annotated, Any, Optional
 
-from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
-from sqlalchemy import select
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Response,
+    UploadFile,
+    status,
+)
+from fastapi_cache.decorator import cache
+from sqlalchemy import inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user, require_role
-from app.core.config import get_settings
+from app.core.cache import COURSE_CACHE_EXPIRE, course_key_builder
 from app.db.session import get_db
 from app.models.course import Course, Enrolment, EnrolmentStatus
 from app.models.material import Material
@@ -21,21 +26,16 @@ from app.models.user import User
 from app.schemas.course import Course as CourseSchema
 from app.schemas.course import CourseCreate, Enrolment as EnrolmentSchema
 from app.schemas.material import Material as MaterialSchema, MaterialList
+from app.schemas.user import User as UserSchema
 from app.services import courses
 
-settings = get_settings()
 router = APIRouter()
 
-def generate_signed_url(material_id: int, expires_in: int = 3600) -> str:
-    """Generate a signed URL for material download."""
-    expires_at = int(time.time()) + expires_in
-    message = f"{material_id}:{expires_at}".encode()
-    signature = hmac.new(
-        settings.SECRET_KEY.encode(),
-        message,
-        hashlib.sha256
-    ).hexdigest()
-    return f"/materials/{material_id}/download?expires={expires_at}&signature={signature}"
+
+def _column_values(obj: Any) -> dict[str, Any]:
+    """Get mapped column values of a freshly written ORM object."""
+    mapper = inspect(obj).mapper
+    return {attr.key: getattr(obj, attr.key) for attr in mapper.column_attrs}
 
 
 @router.post("", response_model=CourseSchema, status_code=status.HTTP_201_CREATED)
@@ -44,12 +44,30 @@ async def create_course(
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: Annotated[User, Depends(require_role("teacher"))],
     course_in: CourseCreate,
-) -> CourseSchema:
+) -> Response:
     """Create new course."""
-    return await courses.create_course(db, current_user, course_in)
+    course = await courses.create_course(db, current_user, course_in)
+    body = CourseSchema.model_construct(
+        **_column_values(course),
+        owner=UserSchema.model_validate(current_user),
+    )
+    return Response(
+        body.model_dump_json(),
+        status_code=status.HTTP_201_CREATED,
+        media_type="application/json",
+    )
 
 
-@router.get("/{course_id}", response_model=CourseSchema)
+@router.get(
+    "/{course_id}",
+    response_model=None,
+    responses={200: {"model": CourseSchema}},
+)
+@cache(
+    expire=COURSE_CACHE_EXPIRE,
+    namespace="course",
+    key_builder=course_key_builder,
+)
 async def get_course(
     *,
     db: Annotated[AsyncSession, Depends(get_db)],
@@ -57,7 +75,12 @@ async def get_course(
     course_id: int,
 ) -> CourseSchema:
     """Get course by ID."""
-    return await courses.get_course(db, current_user, course_id)
+    course = await courses.get_course(db, current_user, course_id)
+    return CourseSchema.model_construct(
+        **_column_values(course),
+        owner=UserSchema.model_validate(course.owner),
+        enrolment_status=getattr(course, "enrolment_status", None),
+    )
 
 
 @router.post(
@@ -71,9 +94,15 @@ async def upload_material(
     current_user: Annotated[User, Depends(get_current_user)],
     course_id: int,
     file: Annotated[UploadFile, File()],
-) -> MaterialSchema:
+) -> Response:
     """Upload course material."""
-    return await courses.upload_material(db, current_user, course_id, file)
+    material = await courses.upload_material(db, current_user, course_id, file)
+    body = MaterialSchema.model_construct(**_column_values(material))
+    return Response(
+        body.model_dump_json(),
+        status_code=status.HTTP_201_CREATED,
+        media_type="application/json",
+    )
 
 
 @router.get("/{course_id}/materials", response_model=MaterialList)
@@ -84,13 +113,14 @@ async def list_materials(
     course_id: int,
     cursor: str | None = None,
     limit: int = Query(default=20, le=100),
-) -> MaterialList:
+) -> Response:
     """List course materials with cursor-based pagination."""
     materials, next_cursor, has_more = await courses.list_materials(
         db, current_user, course_id, cursor, limit
     )
-    return MaterialList(
-        items=materials,
+    body = MaterialList.model_construct(
+        items=[MaterialSchema.from_orm_fast(m) for m in materials],
         next_cursor=next_cursor,
-        has_more=has_more
-    ) 
\ No newline at end of file
+        has_more=has_more,
+    )
+    return Response(body.model_dump_json(), media_type="application/json") 
\ No newline at end of file
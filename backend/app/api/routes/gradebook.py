@@ -2,10 +2,22 @@ from __future__ import annotations
 
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, status
+import msgspec
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi_cache.decorator import cache
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user, require_role
+from app.core.cache import COURSE_CACHE_EXPIRE, course_key_builder
 from app.db.session import get_db
 from app.models.user import User
 from app.schemas.gradebook import Gradebook, GradebookUpdate
@@ -14,7 +26,16 @@ from app.services import gradebook
 router = APIRouter()
 
 
-@router.get("/{course_id}/gradebook", response_model=Gradebook)
+@router.get(
+    "/{course_id}/gradebook",
+    response_model=None,
+    responses={200: {"model": Gradebook}},
+)
+@cache(
+    expire=COURSE_CACHE_EXPIRE,
+    namespace="course",
+    key_builder=course_key_builder,
+)
 async def get_gradebook(
     *,
     db: Annotated[AsyncSession, Depends(get_db)],
@@ -25,16 +46,42 @@ async def get_gradebook(
     return await gradebook.get_gradebook(db, current_user, course_id)
 
 
-@router.patch("/{course_id}/gradebook")
+@router.patch(
+    "/{course_id}/gradebook",
+    # The body is read raw, so publish its schema for the docs by hand
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": msgspec.json.schema(GradebookUpdate)}
+            },
+        }
+    },
+)
 async def update_gradebook(
     *,
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: Annotated[User, Depends(require_role("teacher"))],
     course_id: int,
-    update: GradebookUpdate,
-) -> None:
-    """Update gradebook scores."""
-    await gradebook.update_gradebook(db, current_user, course_id, update)
+    request: Request,
+) -> Response:
+    """Update gradebook scores and return the updated cells."""
+    # Decode with msgspec rather than building a Pydantic model per cell
+    try:
+        update = msgspec.json.decode(await request.body(), type=GradebookUpdate)
+    except msgspec.ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e),
+        )
+    except msgspec.DecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid JSON body",
+        )
+    cells = await gradebook.update_gradebook(db, current_user, course_id, update)
+    # Encode the msgspec cells directly; they are not Pydantic models
+    return Response(msgspec.json.encode(cells), media_type="application/json")
 
 
 @router.websocket("/ws/gradebook/{course_id}")
@@ -1,6 +1,7 @@
-from datetime import datetime, timedelta
+import secrets
 from typing import Annotated
 
+import msgspec
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -9,6 +10,7 @@ from app.core.security import get_current_user
 from app.db.session import get_db
 from app.models.user import User
 from app.schemas.telegram import TelegramBindToken
+from app.services.telegram import TOKEN_TTL
 
 router = APIRouter(prefix="/telegram", tags=["telegram"])
 
@@ -20,20 +22,17 @@ async def generate_bind_token(
 ) -> dict:
     """Generate a token for binding Telegram account."""
     # Generate token
-    token = f"bind_{current_user.id}_{datetime.utcnow().timestamp()}"
+    token = secrets.token_urlsafe(18)
 
     # Create token data
-    token_data = TelegramBindToken(
-        user_id=current_user.id,
-        expires_at=datetime.utcnow() + timedelta(minutes=15),
-    )
+    token_data = TelegramBindToken(user_id=current_user.id)
 
-    # Store token in Redis
+    # Store token in Redis as MessagePack; the key TTL is the token expiry
     redis = await get_redis()
     await redis.set(
         f"telegram:bind_token:{token}",
-        token_data.json(),
-        ex=900,  # 15 minutes
+        msgspec.msgpack.encode(token_data.model_dump()),
+        ex=TOKEN_TTL,
     )
 
     return {"token": token} 
\ No newline at end of file
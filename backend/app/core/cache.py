@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from typing import Any, Callable
+
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+
+from app.core.redis import get_redis
+
+CACHE_PREFIX = "er"
+COURSE_CACHE_EXPIRE = 30  # seconds
+
+
+async def init_cache() -> None:
+    """Initialize response cache."""
+    FastAPICache.init(RedisBackend(await get_redis()), prefix=CACHE_PREFIX)
+
+
+def course_key_builder(
+    func: Callable[..., Any],
+    namespace: str = "",
+    *,
+    request: Any = None,
+    response: Any = None,
+    args: tuple[Any, ...] = (),
+    kwargs: dict[str, Any] | None = None,
+) -> str:
+    """Build a per-course, per-user cache key, ignoring the DB session."""
+    kwargs = kwargs or {}
+    return (
+        f"{namespace}:{kwargs['course_id']}:{kwargs['current_user'].id}:"
+        f"{func.__module__}.{func.__name__}"
+    )
+
+
+async def invalidate_course_cache(course_id: int) -> None:
+    """Drop cached responses for a course."""
+    await FastAPICache.clear(namespace=f"course:{course_id}")
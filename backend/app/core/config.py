@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from functools import lru_cache
+import os
 from typing import Any, List, Union
 
 from pydantic import AnyHttpUrl, PostgresDsn, RedisDsn, validator
@@ -30,6 +30,7 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     ALGORITHM: str = "HS256"
+    PASSWORD_HASH_WORKERS: int = os.cpu_count() or 1
     
     # Database
     POSTGRES_SERVER: str
@@ -37,18 +38,23 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
     SQLALCHEMY_DATABASE_URI: str | None = None
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800
+    DB_STATEMENT_CACHE_SIZE: int = 512
     
     @validator("SQLALCHEMY_DATABASE_URI", pre=True)
     def assemble_db_connection(cls, v: str | None, values: dict[str, any]) -> any:
         if isinstance(v, str):
             return v
-        return f"postgresql://{values.get('POSTGRES_USER')}:{values.get('POSTGRES_PASSWORD')}@{values.get('POSTGRES_SERVER')}/{values.get('POSTGRES_DB')}"
+        return f"postgresql+asyncpg://{values.get('POSTGRES_USER')}:{values.get('POSTGRES_PASSWORD')}@{values.get('POSTGRES_SERVER')}/{values.get('POSTGRES_DB')}"
     
     # Redis
     REDIS_HOST: str
     REDIS_PORT: int
     REDIS_DB: int
     REDIS_URI: RedisDsn | None = None
+    REDIS_MAX_CONNECTIONS: int = 50
     
     @validator("REDIS_URI", pre=True)
     def assemble_redis_connection(cls, v: str | None, values: dict[str, any]) -> any:
@@ -68,6 +74,11 @@ class Settings(BaseSettings):
     # OpenTelemetry
     OTLP_ENDPOINT: str = "localhost:4317"
     OTLP_INSECURE: bool = True
+    OTLP_MAX_QUEUE_SIZE: int = 4096
+    OTLP_SCHEDULE_DELAY_MS: int = 1000
+    OTLP_MAX_EXPORT_BATCH_SIZE: int = 256
+    OTLP_EXPORT_TIMEOUT_MS: int = 10000
+    OTEL_SAMPLE_RATIO: float = 0.05
 
     # Telegram
     TELEGRAM_BOT_TOKEN: str | None = None
@@ -80,7 +91,9 @@ class Settings(BaseSettings):
     )
 
 
-@lru_cache
+settings = Settings()
+
+
 def get_settings() -> Settings:
-    """Get cached settings instance."""
-    return Settings() 
\ No newline at end of file
+    """Get the settings singleton."""
+    return settings 
\ No newline at end of file
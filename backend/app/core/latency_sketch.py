@@ -0,0 +1,69 @@
+import threading
+from typing import Iterator
+
+from ddsketch import DDSketch
+from prometheus_client.core import Metric
+from prometheus_client.registry import REGISTRY, Collector
+
+RELATIVE_ACCURACY = 0.01
+QUANTILES = (0.5, 0.9, 0.99)
+
+Key = tuple[str, str]
+
+# Each thread records into its own sketches; scrapes merge them
+_local = threading.local()
+_all_sketches: list[dict[Key, DDSketch]] = []
+_all_lock = threading.Lock()
+
+def _sketches() -> dict[Key, DDSketch]:
+    """Get the calling thread's sketches, registering them on first use."""
+    sketches = getattr(_local, "sketches", None)
+    if sketches is None:
+        sketches = _local.sketches = {}
+        with _all_lock:
+            _all_sketches.append(sketches)
+    return sketches
+
+def observe(method: str, endpoint: str, seconds: float) -> None:
+    """Record a request latency."""
+    sketches = _sketches()
+    sketch = sketches.get((method, endpoint))
+    if sketch is None:
+        sketch = sketches[(method, endpoint)] = DDSketch(RELATIVE_ACCURACY)
+    sketch.add(seconds)
+
+class LatencySketchCollector(Collector):
+    """Expose merged latency sketches as a Prometheus summary."""
+
+    def collect(self) -> Iterator[Metric]:
+        merged: dict[Key, DDSketch] = {}
+        with _all_lock:
+            per_thread = [dict(sketches) for sketches in _all_sketches]
+        for sketches in per_thread:
+            for key, sketch in sketches.items():
+                if key not in merged:
+                    merged[key] = DDSketch(RELATIVE_ACCURACY)
+                merged[key].merge(sketch)
+
+        metric = Metric(
+            "http_request_duration_seconds",
+            "HTTP request latency in seconds",
+            "summary",
+        )
+        for (method, endpoint), sketch in merged.items():
+            labels = {"method": method, "endpoint": endpoint}
+            for q in QUANTILES:
+                metric.add_sample(
+                    "http_request_duration_seconds",
+                    {**labels, "quantile": str(q)},
+                    sketch.get_quantile_value(q),
+                )
+            metric.add_sample(
+                "http_request_duration_seconds_count", labels, sketch.count
+            )
+            metric.add_sample(
+                "http_request_duration_seconds_sum", labels, sketch.sum
+            )
+        yield metric
+
+REGISTRY.register(LatencySketchCollector())
@@ -0,0 +1,52 @@
+import asyncio
+import sys
+from typing import Any
+
+import orjson
+
+from app.core.metrics import LOG_EVENTS_DROPPED
+
+# Drain tuning
+QUEUE_SIZE = 8192
+BATCH = 128
+TIMEOUT = 0.05
+
+queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+def enqueue(event: dict[str, Any]) -> None:
+    """Queue a log event without blocking; drop it if the queue is full."""
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        LOG_EVENTS_DROPPED.inc()
+
+def _write(batch: list[dict[str, Any]]) -> None:
+    """Serialize a batch of events and write it to stdout in one call."""
+    out = sys.stdout.buffer
+    out.write(b"\n".join(orjson.dumps(event, default=str) for event in batch))
+    out.write(b"\n")
+    out.flush()
+
+async def drain() -> None:
+    """Write queued log events to stdout in batches."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + TIMEOUT
+        while len(batch) < BATCH:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        _write(batch)
+
+def flush() -> None:
+    """Write out whatever is still queued, e.g. on shutdown."""
+    batch = []
+    while not queue.empty():
+        batch.append(queue.get_nowait())
+    if batch:
+        _write(batch)
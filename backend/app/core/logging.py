@@ -1,27 +1,69 @@
 import logging
 import sys
-from datetime import datetime
+import traceback
+from contextvars import ContextVar
+from datetime import datetime, timezone
 from typing import Any, Dict
 
+import orjson
 import structlog
+from structlog.stdlib import ProcessorFormatter
 from opentelemetry import trace
 from opentelemetry.trace import Status, StatusCode
 
-# Configure structlog
-structlog.configure(
-    processors=[
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.stdlib.add_log_level,
-        structlog.stdlib.add_logger_name,
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer()
-    ],
-    context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    wrapper_class=structlog.stdlib.BoundLogger,
-    cache_logger_on_first_use=True,
+from app.core.log_queue import enqueue
+
+# Processors shared by structlog and foreign (stdlib) log records
+shared_processors = [
+    structlog.stdlib.add_logger_name,
+    structlog.stdlib.add_log_level,
+    structlog.stdlib.PositionalArgumentsFormatter(),
+    structlog.processors.TimeStamper(fmt="iso"),
+    structlog.processors.StackInfoRenderer(),
+    structlog.processors.format_exc_info,
+]
+
+def decode_bytes(_, __, event: bytes) -> str:
+    """Decode orjson output for the stdlib handler, which expects str."""
+    return event.decode()
+
+_configured = False
+
+def configure_logging(level: str) -> None:
+    """Configure structlog and stdlib logging to emit orjson lines on stdout."""
+    global _configured
+    if _configured:
+        return
+    _configured = True
+
+    # Level filtering is left to the stdlib logger
+    structlog.configure(
+        processors=[
+            *shared_processors,
+            ProcessorFormatter.wrap_for_formatter,
+        ],
+        context_class=dict,
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+        cache_logger_on_first_use=True,
+    )
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(
+        ProcessorFormatter(
+            foreign_pre_chain=shared_processors,
+            processors=[
+                ProcessorFormatter.remove_processors_meta,
+                structlog.processors.JSONRenderer(serializer=orjson.dumps),
+                decode_bytes,
+            ],
+        )
+    )
+    logging.basicConfig(handlers=[handler], level=level, force=True)
+
+# Trace context formatted once per request by the logging middleware
+_trace_ctx: ContextVar[dict[str, str] | None] = ContextVar(
+    "_trace_ctx", default=None
 )
 
 def get_logger(name: str) -> structlog.BoundLogger:
@@ -30,23 +72,30 @@ def get_logger(name: str) -> structlog.BoundLogger:
 
 def add_trace_context(logger: structlog.BoundLogger, **kwargs: Any) -> structlog.BoundLogger:
     """Add OpenTelemetry trace context to the logger."""
-    current_span = trace.get_current_span()
-    if current_span.is_recording():
-        context = {
-            "trace_id": format(current_span.get_span_context().trace_id, "032x"),
-            "span_id": format(current_span.get_span_context().span_id, "016x"),
-        }
-        return logger.bind(**context, **kwargs)
+    ctx = _trace_ctx.get()
+    if ctx:
+        return logger.bind(**ctx, **kwargs)
     return logger.bind(**kwargs)
 
+def _request_event(
+    event: str, level: str, request_id: str, method: str, url: str
+) -> Dict[str, Any]:
+    """Build a request log event carrying the cached trace context."""
+    return {
+        "event": event,
+        "level": level,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "request_id": request_id,
+        "method": method,
+        "url": url,
+        **(_trace_ctx.get() or {}),
+    }
+
 def log_request(logger: structlog.BoundLogger, request_id: str, method: str, url: str) -> None:
     """Log an incoming request."""
-    add_trace_context(logger).info(
-        "request_started",
-        request_id=request_id,
-        method=method,
-        url=url,
-    )
+    if not logging.getLogger().isEnabledFor(logging.INFO):
+        return
+    enqueue(_request_event("request_started", "info", request_id, method, url))
 
 def log_response(
     logger: structlog.BoundLogger,
@@ -57,14 +106,12 @@ def log_response(
     duration_ms: float,
 ) -> None:
     """Log a response."""
-    add_trace_context(logger).info(
-        "request_finished",
-        request_id=request_id,
-        method=method,
-        url=url,
-        status_code=status_code,
-        duration_ms=duration_ms,
-    )
+    if not logging.getLogger().isEnabledFor(logging.INFO):
+        return
+    event = _request_event("request_finished", "info", request_id, method, url)
+    event["status_code"] = status_code
+    event["duration_ms"] = duration_ms
+    enqueue(event)
 
 def log_error(
     logger: structlog.BoundLogger,
@@ -74,12 +121,10 @@ def log_error(
     error: Exception,
 ) -> None:
     """Log an error."""
-    add_trace_context(logger).error(
-        "request_failed",
-        request_id=request_id,
-        method=method,
-        url=url,
-        error_type=type(error).__name__,
-        error_message=str(error),
-        exc_info=True,
-    ) 
\ No newline at end of file
+    if not logging.getLogger().isEnabledFor(logging.ERROR):
+        return
+    event = _request_event("request_failed", "error", request_id, method, url)
+    event["error_type"] = type(error).__name__
+    event["error_message"] = str(error)
+    event["exception"] = "".join(traceback.format_exception(error))
+    enqueue(event)
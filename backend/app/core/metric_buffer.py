@@ -0,0 +1,20 @@
+import threading
+from collections import defaultdict
+
+Key = tuple[str, str, int]
+
+# Request counts accumulated between flushes
+_counts: defaultdict[Key, int] = defaultdict(int)
+_lock = threading.Lock()
+
+def add(method: str, endpoint: str, status: int) -> None:
+    """Count one request."""
+    with _lock:
+        _counts[(method, endpoint, status)] += 1
+
+def drain() -> dict[Key, int]:
+    """Take the counts accumulated since the last drain."""
+    global _counts
+    with _lock:
+        counts, _counts = _counts, defaultdict(int)
+    return counts
@@ -1,7 +1,16 @@
-from prometheus_client import Counter, Histogram, generate_latest
+from prometheus_client import REGISTRY, Counter
+from prometheus_client.exposition import choose_encoder
 from starlette.responses import Response
 from starlette.requests import Request
+import asyncio
+import gzip
 import time
+from typing import Any
+
+from app.core import latency_sketch, metric_buffer
+
+# Interval between flushes of buffered request counts
+FLUSH_INTERVAL = 0.1
 
 # Request metrics
 REQUEST_COUNT = Counter(
@@ -10,10 +19,9 @@ REQUEST_COUNT = Counter(
     ["method", "endpoint", "status"]
 )
 
-REQUEST_LATENCY = Histogram(
-    "http_request_duration_seconds",
-    "HTTP request latency in seconds",
-    ["method", "endpoint"]
+LOG_EVENTS_DROPPED = Counter(
+    "log_events_dropped_total",
+    "Total number of request log events dropped because the log queue was full"
 )
 
 # Business metrics
@@ -37,29 +45,57 @@ ASSIGNMENT_SUBMISSIONS = Counter(
     "Total number of assignment submissions"
 )
 
+# Labelled children memoized per (method, route, status)
+_count_cache: dict[tuple[str, str, int], Any] = {}
+
 async def metrics_middleware(request: Request, call_next):
     """Middleware to collect request metrics."""
-    start_time = time.time()
+    start_time = time.perf_counter()
     
     response = await call_next(request)
     
-    duration = time.time() - start_time
-    REQUEST_COUNT.labels(
-        method=request.method,
-        endpoint=request.url.path,
-        status=response.status_code
-    ).inc()
-    
-    REQUEST_LATENCY.labels(
-        method=request.method,
-        endpoint=request.url.path
-    ).observe(duration)
+    duration = time.perf_counter() - start_time
+
+    # Label by route template to keep cardinality bounded
+    route = request.scope.get("route")
+    endpoint = route.path if route is not None else "__unmatched__"
+    method = request.method
+    status = response.status_code
+
+    metric_buffer.add(method, endpoint, status)
+
+    # Latency quantiles come from per-thread sketches, merged on scrape
+    if route is not None:
+        latency_sketch.observe(method, endpoint, duration)
     
     return response
 
+def flush_request_counts() -> None:
+    """Apply buffered request counts to REQUEST_COUNT."""
+    for key, n in metric_buffer.drain().items():
+        counter = _count_cache.get(key)
+        if counter is None:
+            method, endpoint, status = key
+            counter = _count_cache[key] = REQUEST_COUNT.labels(
+                method=method, endpoint=endpoint, status=status
+            )
+        counter.inc(n)
+
+async def flush_metrics() -> None:
+    """Flush buffered request counts every FLUSH_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL)
+        flush_request_counts()
+
 async def metrics_endpoint(request: Request) -> Response:
     """Endpoint to expose Prometheus metrics."""
-    return Response(
-        generate_latest(),
-        media_type="text/plain"
-    ) 
\ No newline at end of file
+    # Scrapes always see every request counted so far
+    flush_request_counts()
+    encoder, content_type = choose_encoder(request.headers.get("Accept"))
+    body = encoder(REGISTRY)
+    headers = {"Content-Type": content_type, "Vary": "Accept-Encoding"}
+    # Label sets repeat heavily, so even the fastest level shrinks scrapes a lot
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        body = gzip.compress(body, compresslevel=1)
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, headers=headers) 
\ No newline at end of file
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+
+from cachetools import TTLCache
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+
+from app.core.redis import get_redis
+
+# INCRBY and set the window TTL on first hit, atomically and in one round trip
+SCRIPT = """
+local amount = tonumber(ARGV[2] or 1)
+local count = redis.call('INCRBY', KEYS[1], amount)
+if count == amount then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return count
+"""
+
+_script: AsyncScript | None = None
+_script_client: Redis | None = None
+
+
+def _get_script(redis: Redis) -> AsyncScript:
+    """Get the counter script registered on the shared client."""
+    global _script, _script_client
+    if _script is None or _script_client is not redis:
+        _script = redis.register_script(SCRIPT)
+        _script_client = redis
+    return _script
+
+
+class LocalWindow:
+    """Per-process sliding window of recent hits, one deque per key."""
+
+    def __init__(self, window: int, maxsize: int = 10_000) -> None:
+        self.window = window
+        # Idle keys fall out once their newest hit leaves the window
+        self._hits: TTLCache = TTLCache(maxsize=maxsize, ttl=window)
+        # Hits not yet reported to the shared counter
+        self._pending: TTLCache = TTLCache(maxsize=maxsize, ttl=window)
+
+    def count(self, key: str) -> int:
+        """Count this process's hits on the key within the window."""
+        hits = self._hits.get(key)
+        if hits is None:
+            return 0
+        cutoff = time.monotonic() - self.window
+        while hits and hits[0] < cutoff:
+            hits.popleft()
+        return len(hits)
+
+    def add(self, key: str) -> None:
+        """Record a hit on the key."""
+        hits = self._hits.get(key) or deque()
+        hits.append(time.monotonic())
+        self._hits[key] = hits
+        self._pending[key] = self._pending.get(key, 0) + 1
+
+    def take_pending(self, key: str) -> int:
+        """Return and reset the hits not yet reported for the key."""
+        return self._pending.pop(key, 0)
+
+
+async def hit(key: str, window: int) -> int:
+    """Count a hit in the fixed window and return the current count."""
+    redis = await get_redis()
+    return await _get_script(redis)(keys=[key], args=[window])
+
+
+async def hit_many(
+    keys: list[str], window: int, amounts: list[int] | None = None
+) -> list[int]:
+    """Count hits on several keys in a single round trip."""
+    redis = await get_redis()
+    script = _get_script(redis)
+    async with redis.pipeline(transaction=False) as pipe:
+        for key, amount in zip(keys, amounts or [1] * len(keys)):
+            await script(keys=[key], args=[window, amount], client=pipe)
+        return await pipe.execute()
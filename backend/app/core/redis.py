@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from redis.asyncio import Redis
+
+from app.core.config import settings
+
+_redis: Redis | None = None
+
+
+async def get_redis() -> Redis:
+    """Get shared Redis client."""
+    global _redis
+    # No await before the assignment, so concurrent callers cannot race here
+    if _redis is None:
+        _redis = Redis.from_url(
+            str(settings.REDIS_URI),
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+        )
+    return _redis
+
+
+async def close_redis() -> None:
+    """Close shared Redis client."""
+    global _redis
+    if _redis is not None:
+        await _redis.close()
+        _redis = None
@@ -1,48 +1,128 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta
+import asyncio
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
-from jose import jwt
-from passlib.context import CryptContext
-from passlib.hash import argon2
+import jwt
+import orjson
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 
-from app.core.config import get_settings
+from app.core.config import settings
 
-settings = get_settings()
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+JWT_SECRET_KEY = settings.SECRET_KEY
+JWT_ALGORITHM = settings.ALGORITHM
+
+# argon2-cffi defaults (RFC 9106 low-memory profile): time_cost=3,
+# memory_cost=64 MiB, parallelism=4. Only lower them after a security review.
+_ph = PasswordHasher()
+
+# Dedicated pool so argon2 never queues behind unrelated blocking work; each
+# hash saturates a core, so size it around the CPU count
+_pw_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="argon2"
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return _ph.verify(hashed_password, plain_password)
+    except (VerificationError, InvalidHashError):
+        return False
 
 
 def get_password_hash(password: str) -> str:
     """Get password hash."""
-    return pwd_context.hash(password)
+    return _ph.hash(password)
 
 
-def create_access_token(subject: str | Any) -> str:
-    """Create access token."""
-    expire = datetime.utcnow() + timedelta(
-        minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in the password worker pool."""
+    return await asyncio.get_running_loop().run_in_executor(
+        _pw_executor, verify_password, plain_password, hashed_password
     )
-    to_encode = {"exp": expire, "sub": str(subject)}
-    return jwt.encode(
-        to_encode,
-        settings.SECRET_KEY,
-        algorithm=settings.ALGORITHM,
+
+
+async def aget_password_hash(password: str) -> str:
+    """Hash a password in the password worker pool."""
+    return await asyncio.get_running_loop().run_in_executor(
+        _pw_executor, get_password_hash, password
     )
 
 
+def shutdown_password_executor() -> None:
+    """Stop the password worker pool."""
+    _pw_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Check whether a hash was made with outdated argon2 parameters."""
+    return _ph.check_needs_rehash(hashed_password)
+
+
+# HMAC digests for the HS* algorithms we encode ourselves
+_JWT_DIGESTS = {
+    "HS256": hashlib.sha256,
+    "HS384": hashlib.sha384,
+    "HS512": hashlib.sha512,
+}
+
+
+def _b64url(data: bytes) -> bytes:
+    """Base64url-encode without padding."""
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+# Fixed header segment and keyed HMAC state, built once at import
+_JWT_HEADER = _b64url(orjson.dumps({"alg": JWT_ALGORITHM, "typ": "JWT"})) + b"."
+_JWT_HMAC = (
+    hmac.new(JWT_SECRET_KEY.encode(), b"", _JWT_DIGESTS[JWT_ALGORITHM])
+    if JWT_ALGORITHM in _JWT_DIGESTS
+    else None
+)
+
+
+def _encode(payload: dict[str, Any]) -> str:
+    """Encode an HS* JWT with the cached header and key."""
+    if _JWT_HMAC is None:
+        return jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+    msg = _JWT_HEADER + _b64url(orjson.dumps(payload))
+    h = _JWT_HMAC.copy()
+    h.update(msg)
+    return (msg + b"." + _b64url(h.digest())).decode()
+
+
+def create_access_token(subject: str | Any, roles: list[str] | None = None) -> str:
+    """Create access token."""
+    expire = int(time.time()) + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    return _encode({"exp": expire, "sub": str(subject), "roles": roles or []})
+
+
 def create_refresh_token(subject: str | Any) -> str:
     """Create refresh token."""
-    expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode = {"exp": expire, "sub": str(subject)}
-    return jwt.encode(
-        to_encode,
-        settings.SECRET_KEY,
-        algorithm=settings.ALGORITHM,
-    ) 
\ No newline at end of file
+    expire = int(time.time()) + settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400
+    # Random jti keeps tokens issued within the same second unique
+    return _encode(
+        {"exp": expire, "sub": str(subject), "jti": secrets.token_urlsafe()}
+    )
+
+
+# Keyed HMAC state, copied per signature instead of re-deriving the key
+_SIGNING_HMAC = hmac.new(settings.SECRET_KEY.encode(), b"", hashlib.sha256)
+
+
+def generate_signed_url(material_id: int, expires_in: int = 3600) -> str:
+    """Generate a signed URL for material download."""
+    expires_at = int(time.time()) + expires_in
+    h = _SIGNING_HMAC.copy()
+    h.update(b"%d:%d" % (material_id, expires_at))
+    signature = h.hexdigest()
+    return f"/materials/{material_id}/download?expires={expires_at}&signature={signature}"
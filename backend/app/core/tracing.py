@@ -4,6 +4,7 @@ from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import ParentBasedTraceIdRatio
 
 from app.core.config import settings
 
@@ -16,8 +17,11 @@ def setup_tracing(app):
         "deployment.environment": settings.ENVIRONMENT,
     })
 
-    # Create a tracer provider
-    tracer_provider = TracerProvider(resource=resource)
+    # Create a tracer provider, sampling a fraction of root traces
+    tracer_provider = TracerProvider(
+        resource=resource,
+        sampler=ParentBasedTraceIdRatio(settings.OTEL_SAMPLE_RATIO),
+    )
 
     # Create an OTLP exporter
     otlp_exporter = OTLPSpanExporter(
@@ -27,7 +31,13 @@ def setup_tracing(app):
 
     # Add the exporter to the tracer provider
     tracer_provider.add_span_processor(
-        BatchSpanProcessor(otlp_exporter)
+        BatchSpanProcessor(
+            otlp_exporter,
+            max_queue_size=settings.OTLP_MAX_QUEUE_SIZE,
+            schedule_delay_millis=settings.OTLP_SCHEDULE_DELAY_MS,
+            max_export_batch_size=settings.OTLP_MAX_EXPORT_BATCH_SIZE,
+            export_timeout_millis=settings.OTLP_EXPORT_TIMEOUT_MS,
+        )
     )
 
     # Set the tracer provider
@@ -0,0 +1,46 @@
+import asyncio
+from typing import Any
+
+import orjson
+from fastapi import WebSocket
+
+# Payloads a socket may fall behind by before it is treated as dead
+MAX_PENDING = 1000
+
+
+class BatchedSender:
+    """Coalesce queued payloads into one JSON-array frame per send."""
+
+    def __init__(self, websocket: WebSocket) -> None:
+        self.websocket = websocket
+        self.closed = False
+        self._queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=MAX_PENDING)
+        self._task = asyncio.create_task(self._run())
+
+    def send(self, payload: Any) -> None:
+        """Queue a payload for the next frame; dropped once closed."""
+        if self.closed:
+            return
+        try:
+            self._queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            # Stop buffering for a client that has stopped reading
+            self.close()
+
+    async def _run(self) -> None:
+        """Write everything queued since the last frame as a single array."""
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                while not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                await self.websocket.send_text(orjson.dumps(batch).decode())
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.closed = True
+
+    def close(self) -> None:
+        """Stop the writer task."""
+        self.closed = True
+        self._task.cancel()
@@ -0,0 +1,5 @@
+"""CRUD package."""
+
+from app.crud.course_role import course_role
+
+__all__ = ["course_role"]
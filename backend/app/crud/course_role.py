@@ -1,49 +1,80 @@
 from typing import List, Optional
-from sqlalchemy.orm import Session
 
-from app.crud.base import CRUDBase
-from app.models.course_role import CourseRole, CourseRoleEnum
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.course_role import CourseRole
 from app.schemas.course_role import CourseRoleCreate, CourseRoleUpdate
 
-class CRUDCourseRole(CRUDBase[CourseRole, CourseRoleCreate, CourseRoleUpdate]):
-    def get_by_course_and_user(
-        self, db: Session, *, course_id: int, user_id: int
+class CRUDCourseRole:
+    async def get_by_course_and_user(
+        self, db: AsyncSession, *, course_id: int, user_id: int
     ) -> Optional[CourseRole]:
-        return db.query(CourseRole).filter(
-            CourseRole.course_id == course_id,
-            CourseRole.user_id == user_id
-        ).first()
+        result = await db.execute(
+            select(CourseRole).where(
+                CourseRole.course_id == course_id,
+                CourseRole.user_id == user_id,
+            )
+        )
+        return result.scalar_one_or_none()
 
-    def get_course_roles(
-        self, db: Session, *, course_id: int, skip: int = 0, limit: int = 100
+    async def get_course_roles(
+        self, db: AsyncSession, *, course_id: int, skip: int = 0, limit: int = 100
     ) -> List[CourseRole]:
-        return db.query(CourseRole).filter(
-            CourseRole.course_id == course_id
-        ).offset(skip).limit(limit).all()
+        result = await db.execute(
+            select(CourseRole)
+            .where(CourseRole.course_id == course_id)
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(result.scalars())
 
-    def create_with_course(
-        self, db: Session, *, obj_in: CourseRoleCreate, course_id: int
+    async def create_with_course(
+        self, db: AsyncSession, *, obj_in: CourseRoleCreate, course_id: int
     ) -> CourseRole:
-        db_obj = CourseRole(
-            course_id=course_id,
-            user_id=obj_in.user_id,
-            role=obj_in.role
+        result = await db.execute(
+            insert(CourseRole)
+            .values(course_id=course_id, user_id=obj_in.user_id, role=obj_in.role)
+            .returning(CourseRole)
+        )
+        db_obj = result.scalar_one()
+        await db.commit()
+        return db_obj
+
+    async def update_role(
+        self,
+        db: AsyncSession,
+        *,
+        course_id: int,
+        user_id: int,
+        obj_in: CourseRoleUpdate,
+    ) -> Optional[CourseRole]:
+        result = await db.execute(
+            update(CourseRole)
+            .where(
+                CourseRole.course_id == course_id,
+                CourseRole.user_id == user_id,
+            )
+            .values(role=obj_in.role)
+            .returning(CourseRole)
         )
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        db_obj = result.scalar_one_or_none()
+        await db.commit()
         return db_obj
 
-    def remove_role(
-        self, db: Session, *, course_id: int, user_id: int
+    async def remove_role(
+        self, db: AsyncSession, *, course_id: int, user_id: int
     ) -> Optional[CourseRole]:
-        obj = db.query(CourseRole).filter(
-            CourseRole.course_id == course_id,
-            CourseRole.user_id == user_id
-        ).first()
-        if obj:
-            db.delete(obj)
-            db.commit()
+        result = await db.execute(
+            delete(CourseRole)
+            .where(
+                CourseRole.course_id == course_id,
+                CourseRole.user_id == user_id,
+            )
+            .returning(CourseRole)
+        )
+        obj = result.scalar_one_or_none()
+        await db.commit()
         return obj
 
-course_role = CRUDCourseRole(CourseRole) 
\ No newline at end of file
+course_role = CRUDCourseRole()
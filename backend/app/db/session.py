@@ -2,20 +2,33 @@ from __future__ import annotations
 
 from typing import AsyncGenerator
 
+import orjson
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 
-from app.core.config import get_settings
-
-settings = get_settings()
+from app.core.config import settings
 
 engine = create_async_engine(
     settings.SQLALCHEMY_DATABASE_URI,
     echo=False,
     future=True,
+    query_cache_size=1200,
+    # JSON/JSONB columns go through orjson rather than the stdlib json module
+    json_serializer=lambda obj: orjson.dumps(obj).decode(),
+    json_deserializer=orjson.loads,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    connect_args={
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        # Short OLTP queries never benefit from JIT compilation
+        "server_settings": {"jit": "off"},
+    },
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -30,7 +43,4 @@ AsyncSessionLocal = async_sessionmaker(
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """Get database session."""
     async with AsyncSessionLocal() as session:
-        try:
-            yield session
-        finally:
-            await session.close() 
\ No newline at end of file
+        yield session 
\ No newline at end of file
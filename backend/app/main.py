@@ -2,14 +2,17 @@ from __future__ import annotations
 
 from datetime import datetime, timezone
 from typing import Annotated
+import asyncio
 import time
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from opentelemetry import trace
+from sqlalchemy.orm import configure_mappers
 import structlog
-from structlog.stdlib import ProcessorFormatter
-import logging
-import sys
+import hashlib
+import ssl
 
 from app.api.routes import (
     auth,
@@ -24,45 +27,34 @@ from app.api.routes import (
     chat,
     course_role,
 )
+from app.core import log_queue
+from app.core.cache import init_cache
 from app.core.config import settings
 from app.db.session import async_session
 from app.services.telegram import TelegramBot
-from app.core.logging import get_logger, log_request, log_response, log_error
-from app.core.metrics import metrics_middleware, metrics_endpoint
-from app.core.tracing import setup_tracing
-
-# Configure structlog
-structlog.configure(
-    processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
-        structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer()
-    ],
-    context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    wrapper_class=structlog.stdlib.BoundLogger,
-    cache_logger_on_first_use=True,
+from app.core.logging import (
+    _trace_ctx,
+    configure_logging,
+    get_logger,
+    log_error,
+    log_request,
+    log_response,
 )
+from app.core.metrics import flush_metrics, metrics_middleware, metrics_endpoint
+from app.core.redis import close_redis
+from app.core.security import shutdown_password_executor
+from app.core.tracing import setup_tracing
 
-# Configure standard library logging
-logging.basicConfig(
-    format="%(message)s",
-    stream=sys.stdout,
-    level=settings.LOG_LEVEL,
-    force=True,
-)
+# Configure logging
+configure_logging(settings.LOG_LEVEL)
 
 logger = structlog.get_logger()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    # Render JSON responses with orjson instead of the stdlib encoder
+    default_response_class=ORJSONResponse,
 )
 
 # Set up CORS
@@ -77,9 +69,6 @@ app.add_middleware(
 # Set up metrics middleware
 app.middleware("http")(metrics_middleware)
 
-# Set up tracing
-setup_tracing(app)
-
 # Add metrics endpoint
 app.add_route("/metrics", metrics_endpoint)
 
@@ -88,7 +77,18 @@ app.add_route("/metrics", metrics_endpoint)
 async def log_requests(request: Request, call_next):
     request_id = request.headers.get("X-Request-ID", "")
     start_time = time.time()
-    
+
+    # Format the trace context once for every log line of this request
+    trace_ctx = None
+    span = trace.get_current_span()
+    if span.is_recording():
+        span_ctx = span.get_span_context()
+        trace_ctx = {
+            "trace_id": f"{span_ctx.trace_id:032x}",
+            "span_id": f"{span_ctx.span_id:016x}",
+        }
+    trace_token = _trace_ctx.set(trace_ctx)
+
     try:
         log_request(logger, request_id, request.method, str(request.url))
         response = await call_next(request)
@@ -98,6 +98,12 @@ async def log_requests(request: Request, call_next):
     except Exception as e:
         log_error(logger, request_id, request.method, str(request.url), e)
         raise
+    finally:
+        _trace_ctx.reset(trace_token)
+
+# Set up tracing last so its middleware wraps the others and request logs
+# run inside the server span
+setup_tracing(app)
 
 # Include routers
 app.include_router(health.router, prefix=settings.API_V1_STR)
@@ -113,11 +119,26 @@ app.include_router(telegram.router, prefix=settings.API_V1_STR)
 # Telegram bot
 telegram_bot = None
 
+# Background tasks writing queued request logs and buffered metrics
+log_drain_task: asyncio.Task | None = None
+metrics_flush_task: asyncio.Task | None = None
+
 
 @app.on_event("startup")
 async def startup_event():
     """Startup event handler."""
-    global telegram_bot
+    global telegram_bot, log_drain_task, metrics_flush_task
+    log_drain_task = asyncio.create_task(log_queue.drain())
+    metrics_flush_task = asyncio.create_task(flush_metrics())
+    # Compile mappers now rather than on the first request
+    configure_mappers()
+    # Material hashing relies on OpenSSL's accelerated SHA-256
+    logger.info(
+        "hashlib_backend",
+        sha256=hashlib.sha256().name,
+        openssl=ssl.OPENSSL_VERSION,
+    )
+    await init_cache()
     async with async_session() as session:
         telegram_bot = TelegramBot(session)
         await telegram_bot.start()
@@ -128,6 +149,13 @@ async def shutdown_event():
     """Shutdown event handler."""
     if telegram_bot:
         await telegram_bot.stop()
+    await close_redis()
+    shutdown_password_executor()
+    if metrics_flush_task:
+        metrics_flush_task.cancel()
+    if log_drain_task:
+        log_drain_task.cancel()
+    log_queue.flush()
 
 
 @app.get("/health")
@@ -1,10 +1,9 @@
 from __future__ import annotations
 
-from datetime import datetime
 from enum import Enum
 from typing import List
 
-from sqlalchemy import Enum as SQLEnum, ForeignKey, String, Column, Integer, DateTime, Boolean
+from sqlalchemy import Enum as SQLEnum, ForeignKey, String, Column, Integer, Boolean
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -23,14 +22,11 @@ class Course(Base):
 
     __tablename__ = "courses"
 
-    id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     code: Mapped[str] = mapped_column(String(50), nullable=False)
     description = Column(String)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
-    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     owner: Mapped["User"] = relationship("User", back_populates="owned_courses")
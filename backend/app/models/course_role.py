@@ -1,9 +1,8 @@
-from datetime import datetime
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, ForeignKey, Enum, UniqueConstraint
 from sqlalchemy.orm import relationship
 import enum
 
-from app.db.base_class import Base
+from app.db.base import Base
 
 class CourseRoleEnum(str, enum.Enum):
     OWNER = "owner"
@@ -12,13 +11,13 @@ class CourseRoleEnum(str, enum.Enum):
 
 class CourseRole(Base):
     __tablename__ = "course_roles"
+    __table_args__ = (
+        UniqueConstraint("course_id", "user_id", name="uq_course_roles_course_user"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
     course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     role = Column(Enum(CourseRoleEnum), nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
-    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     course = relationship("Course", back_populates="roles")
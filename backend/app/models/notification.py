@@ -1,13 +1,13 @@
 from __future__ import annotations
 
-from datetime import datetime
 from enum import Enum
 from typing import Optional
 
-from sqlalchemy import Boolean, DateTime, Enum as SQLEnum, ForeignKey, JSON, String
+from sqlalchemy import Boolean, Enum as SQLEnum, ForeignKey, JSON, String
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from app.db.base_class import Base
+from app.db.base import Base
 
 
 class NotificationType(str, Enum):
@@ -23,12 +23,10 @@ class Notification(Base):
 
     __tablename__ = "notifications"
 
-    id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
     type: Mapped[NotificationType] = mapped_column(SQLEnum(NotificationType))
-    payload: Mapped[dict] = mapped_column(JSON)
+    payload: Mapped[dict] = mapped_column(JSON().with_variant(JSONB, "postgresql"))
     delivered: Mapped[bool] = mapped_column(Boolean, default=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     # Relationships
     user: Mapped["User"] = relationship(back_populates="notifications") 
\ No newline at end of file
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 from datetime import datetime
+from functools import cached_property
 from typing import List
 
-from sqlalchemy import Boolean, String
+from sqlalchemy import BigInteger, Boolean, Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -13,18 +14,28 @@ class User(Base):
     """User model."""
 
     __tablename__ = "users"
+    __table_args__ = (
+        Index(
+            "uq_users_email",
+            "email",
+            unique=True,
+            postgresql_include=["password_hash", "is_active"],
+        ),
+    )
 
-    email: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
+    email: Mapped[str] = mapped_column(String(255), nullable=False)
     first_name: Mapped[str] = mapped_column(String(255), nullable=False)
     last_name: Mapped[str] = mapped_column(String(255), nullable=False)
     password_hash: Mapped[str] = mapped_column(String(255), nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    telegram_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
 
     # Relationships
     roles: Mapped[List["Role"]] = relationship(
         "Role",
         secondary="user_roles",
         back_populates="users",
+        lazy="selectin",
     )
     refresh_tokens: Mapped[List["RefreshToken"]] = relationship(
         "RefreshToken",
@@ -47,5 +58,15 @@ class User(Base):
         back_populates="uploader",
     )
 
+    @cached_property
+    def role_names(self) -> frozenset[str]:
+        """Names of the user's roles."""
+        return frozenset(r.name for r in self.roles)
+
+    @cached_property
+    def is_teacher(self) -> bool:
+        """Whether the user has the teacher role."""
+        return "teacher" in self.role_names
+
     def __repr__(self) -> str:
         return f"<User {self.email}>" 
\ No newline at end of file
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
 
+import msgspec
 from pydantic import BaseModel, Field
 
 
@@ -25,19 +26,24 @@ class Assignment(AssignmentBase):
     created_at: datetime
     updated_at: datetime
 
+    @classmethod
+    def from_orm_fast(cls, obj: Any) -> "Assignment":
+        """Build from a trusted ORM object without validation."""
+        return cls.model_construct(**{f: getattr(obj, f) for f in cls.model_fields})
+
     class Config:
         from_attributes = True
 
 
-class GradebookCell(BaseModel):
-    """Gradebook cell schema."""
+class GradebookCell(msgspec.Struct, gc=False):
+    """Gradebook cell schema; untracked by the GC as it holds only scalars."""
     student_id: int
     assignment_id: int
     score: Optional[int] = None
 
 
-class GradebookUpdate(BaseModel):
-    """Gradebook update schema."""
+class GradebookUpdate(msgspec.Struct):
+    """Gradebook update schema, decoded with msgspec for large bodies."""
     updates: list[GradebookCell]
 
 
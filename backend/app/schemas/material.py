@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
+
+from app.core.security import generate_signed_url
 
 
 class MaterialBase(BaseModel):
@@ -28,10 +30,20 @@ class Material(MaterialBase):
     course_id: int
     uploader_id: int
     stored_path: str
-    download_url: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
+    @computed_field
+    @property
+    def download_url(self) -> str:
+        """Signed download URL."""
+        return generate_signed_url(self.id)
+
+    @classmethod
+    def from_orm_fast(cls, obj: Any) -> "Material":
+        """Build from a trusted ORM object without validation."""
+        return cls.model_construct(**{f: getattr(obj, f) for f in cls.model_fields})
+
     class Config:
         """Pydantic config."""
 
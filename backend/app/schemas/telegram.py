@@ -1,10 +1,7 @@
-from datetime import datetime
-
 from pydantic import BaseModel
 
 
 class TelegramBindToken(BaseModel):
-    """Telegram bind token schema."""
+    """Telegram bind token schema; expiry is the Redis key TTL."""
 
-    user_id: int
-    expires_at: datetime 
\ No newline at end of file
+    user_id: int 
\ No newline at end of file
@@ -1,34 +1,96 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import hashlib
-import hmac
 import os
-import time
 import uuid
 from typing import Optional
 
+import aiofiles
 from fastapi import HTTPException, UploadFile, status
-from sqlalchemy import select
+from sqlalchemy import and_, bindparam, exists, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.core.config import get_settings
+from app.core.cache import invalidate_course_cache
 from app.models.course import Course, Enrolment, EnrolmentStatus
 from app.models.material import Material
 from app.models.user import User
 from app.schemas.course import CourseCreate
 
-settings = get_settings()
 
-def generate_signed_url(material_id: int, expires_in: int = 3600) -> str:
-    """Generate a signed URL for material download."""
-    expires_at = int(time.time()) + expires_in
-    message = f"{material_id}:{expires_at}".encode()
-    signature = hmac.new(
-        settings.SECRET_KEY.encode(),
-        message,
-        hashlib.sha256
-    ).hexdigest()
-    return f"/materials/{material_id}/download?expires={expires_at}&signature={signature}"
+UPLOAD_CHUNK_SIZE = 64 * 1024
+HASH_BATCH_SIZE = 1024 * 1024
+INCOMING_DIR = "data/materials/.incoming"
+MAX_UPLOAD_SIZE = 20 * 1024 * 1024  # 20 MB
+
+# Hot-path statements, built once and reused with bound parameters
+_COURSE_OWNER = select(Course.owner_id).where(Course.id == bindparam("course_id"))
+
+_COURSE_WITH_ENROLMENT = (
+    select(Course, Enrolment)
+    .outerjoin(
+        Enrolment,
+        and_(
+            Enrolment.course_id == Course.id,
+            Enrolment.user_id == bindparam("user_id"),
+        ),
+    )
+    .where(Course.id == bindparam("course_id"))
+    .options(joinedload(Course.owner))
+)
+
+_HASH_IN_COURSE = select(
+    exists().where(
+        Material.sha256 == bindparam("sha256"),
+        Material.course_id == bindparam("course_id"),
+    )
+)
+
+_STORED_PATH_BY_HASH = (
+    select(Material.stored_path)
+    .where(Material.sha256 == bindparam("sha256"))
+    .limit(1)
+)
+
+def _materials_page(page_filter):
+    """Build the materials page query with course access columns."""
+    is_enrolled = exists().where(
+        Enrolment.course_id == Course.id,
+        Enrolment.user_id == bindparam("user_id"),
+        Enrolment.status == EnrolmentStatus.ACTIVE,
+    )
+    return (
+        select(Course.owner_id, is_enrolled.label("is_enrolled"), Material)
+        .select_from(Course)
+        .outerjoin(Material, page_filter)
+        .where(Course.id == bindparam("course_id"))
+        .order_by(Material.id.desc())
+        .limit(bindparam("limit"))
+    )
+
+_MATERIALS_PAGE = _materials_page(Material.course_id == Course.id)
+_MATERIALS_PAGE_AFTER = _materials_page(
+    and_(Material.course_id == Course.id, Material.id < bindparam("cursor_id"))
+)
+
+# Directories known to exist in this process
+_MATERIAL_DIRS: set[str] = set()
+
+def _ensure_dir(path: str) -> None:
+    """Create a directory once per process."""
+    if path not in _MATERIAL_DIRS:
+        os.makedirs(path, exist_ok=True)
+        _MATERIAL_DIRS.add(path)
+
+def _drop_page_cache(fd: int) -> None:
+    """Flush a written file and evict it from the page cache."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    os.fdatasync(fd)
+    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
 
 async def create_course(
     db: AsyncSession,
@@ -36,15 +98,18 @@ async def create_course(
     course_in: CourseCreate,
 ) -> Course:
     """Create new course."""
-    course = Course(
-        title=course_in.title,
-        code=course_in.code,
-        description=course_in.description,
-        owner_id=current_user.id,
+    course = await db.scalar(
+        insert(Course)
+        .values(
+            title=course_in.title,
+            code=course_in.code,
+            description=course_in.description,
+            owner_id=current_user.id,
+        )
+        .returning(Course)
     )
-    db.add(course)
     await db.commit()
-    await db.refresh(course)
+    set_committed_value(course, "owner", current_user)
     return course
 
 async def get_course(
@@ -53,22 +118,18 @@ async def get_course(
     course_id: int,
 ) -> Course:
     """Get course by ID."""
-    result = await db.execute(select(Course).where(Course.id == course_id))
-    course = result.scalar_one_or_none()
+    # Get course together with the user's enrolment
+    result = await db.execute(
+        _COURSE_WITH_ENROLMENT,
+        {"course_id": course_id, "user_id": current_user.id},
+    )
+    course, enrolment = result.one_or_none() or (None, None)
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Course not found",
         )
 
-    # Get enrolment status
-    result = await db.execute(
-        select(Enrolment).where(
-            Enrolment.course_id == course_id,
-            Enrolment.user_id == current_user.id,
-        )
-    )
-    enrolment = result.scalar_one_or_none()
     if enrolment:
         course.enrolment_status = enrolment.status
 
@@ -82,17 +143,14 @@ async def upload_material(
 ) -> Material:
     """Upload course material."""
     # Check course exists and user has access
-    result = await db.execute(select(Course).where(Course.id == course_id))
-    course = result.scalar_one_or_none()
-    if not course:
+    row = (await db.execute(_COURSE_OWNER, {"course_id": course_id})).first()
+    if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Course not found",
         )
 
-    if course.owner_id != current_user.id and not any(
-        r.name == "teacher" for r in current_user.roles
-    ):
+    if row.owner_id != current_user.id and not current_user.is_teacher:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
@@ -113,56 +171,75 @@ async def upload_material(
             detail="Unsupported file type",
         )
 
-    # Read file content
-    content = await file.read()
-    file_size = len(content)
-
-    # Validate file size
-    if file_size > 20 * 1024 * 1024:  # 20 MB
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File too large",
-        )
-
-    # Check for duplicate file
-    sha256 = hashlib.sha256(content).hexdigest()
-    result = await db.execute(
-        select(Material).where(
-            Material.course_id == course_id,
-            Material.sha256 == sha256,
-        )
-    )
-    if result.scalar_one_or_none():
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="File already exists",
-        )
+    # Stream file to an incoming path, hashing and measuring as we go
+    _ensure_dir(INCOMING_DIR)
+    ext = os.path.splitext(file.filename)[1]
+    incoming_path = f"{INCOMING_DIR}/{uuid.uuid4()}"
+    try:
+        hasher = hashlib.sha256()
+        file_size = 0
+        buffer = bytearray()
+        async with aiofiles.open(incoming_path, "wb") as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > MAX_UPLOAD_SIZE:
+                    break
+                buffer += chunk
+                if len(buffer) >= HASH_BATCH_SIZE:
+                    # Hash off the event loop while the batch is written
+                    await asyncio.gather(
+                        asyncio.to_thread(hasher.update, buffer), f.write(buffer)
+                    )
+                    buffer = bytearray()
+            if buffer and file_size <= MAX_UPLOAD_SIZE:
+                await asyncio.gather(
+                    asyncio.to_thread(hasher.update, buffer), f.write(buffer)
+                )
+            await f.flush()
+            await asyncio.to_thread(_drop_page_cache, f.fileno())
 
-    # Create storage directory
-    os.makedirs(f"data/materials/{course_id}", exist_ok=True)
+        # Validate file size
+        if file_size > MAX_UPLOAD_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="File too large",
+            )
 
-    # Save file
-    ext = os.path.splitext(file.filename)[1]
-    stored_path = f"data/materials/{course_id}/{uuid.uuid4()}{ext}"
-    with open(stored_path, "wb") as f:
-        f.write(content)
+        # Check for duplicate file, reusing an already stored blob
+        sha256 = hasher.hexdigest()
+        if await db.scalar(
+            _HASH_IN_COURSE, {"sha256": sha256, "course_id": course_id}
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="File already exists",
+            )
+        stored_path = await db.scalar(_STORED_PATH_BY_HASH, {"sha256": sha256})
+        if stored_path is None:
+            _ensure_dir(f"data/materials/{course_id}")
+            stored_path = f"data/materials/{course_id}/{sha256}{ext}"
+            os.replace(incoming_path, stored_path)
+    finally:
+        # Drop the incoming file unless it was moved into place
+        with contextlib.suppress(FileNotFoundError):
+            await asyncio.to_thread(os.remove, incoming_path)
 
     # Create material record
-    material = Material(
-        course_id=course_id,
-        uploader_id=current_user.id,
-        filename=file.filename,
-        mime_type=file.content_type,
-        size=file_size,
-        stored_path=stored_path,
-        sha256=sha256,
+    material = await db.scalar(
+        insert(Material)
+        .values(
+            course_id=course_id,
+            uploader_id=current_user.id,
+            filename=file.filename,
+            mime_type=file.content_type,
+            size=file_size,
+            stored_path=stored_path,
+            sha256=sha256,
+        )
+        .returning(Material)
     )
-    db.add(material)
     await db.commit()
-    await db.refresh(material)
-
-    # Add signed download URL
-    material.download_url = generate_signed_url(material.id)
+    await invalidate_course_cache(course_id)
 
     return material
 
@@ -174,57 +251,41 @@ async def list_materials(
     limit: int = 20,
 ) -> tuple[list[Material], Optional[str], bool]:
     """List course materials with cursor-based pagination."""
-    # Check course exists and user is enrolled
-    result = await db.execute(select(Course).where(Course.id == course_id))
-    course = result.scalar_one_or_none()
-    if not course:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Course not found",
-        )
-
-    if course.owner_id != current_user.id:
-        result = await db.execute(
-            select(Enrolment).where(
-                Enrolment.course_id == course_id,
-                Enrolment.user_id == current_user.id,
-                Enrolment.status == EnrolmentStatus.ACTIVE,
-            )
-        )
-        if not result.scalar_one_or_none():
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not enrolled in course",
-            )
-
-    # Build query
-    query = select(Material).where(Material.course_id == course_id)
-    
+    params = {"course_id": course_id, "user_id": current_user.id, "limit": limit + 1}
+    query = _MATERIALS_PAGE
     if cursor:
         try:
-            cursor_id = int(cursor)
-            query = query.where(Material.id < cursor_id)
+            params["cursor_id"] = int(cursor)
         except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid cursor",
             )
+        query = _MATERIALS_PAGE_AFTER
 
-    # Get materials
-    query = query.order_by(Material.id.desc()).limit(limit + 1)
-    result = await db.execute(query)
-    materials = result.scalars().all()
+    # Get course access and the materials page in one round trip
+    result = await db.execute(query, params)
+    rows = result.all()
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found",
+        )
+
+    if rows[0].owner_id != current_user.id and not rows[0].is_enrolled:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enrolled in course",
+        )
+
+    materials = [row.Material for row in rows if row.Material is not None]
 
     # Check if there are more results
     has_more = len(materials) > limit
     if has_more:
         materials = materials[:-1]
 
-    # Add signed download URLs
-    for material in materials:
-        material.download_url = generate_signed_url(material.id)
-
     # Get next cursor
     next_cursor = str(materials[-1].id) if materials and has_more else None
 
-    return materials, next_cursor, has_more 
\ No newline at end of file
+    return materials, next_cursor, has_more
@@ -1,15 +1,84 @@
 from __future__ import annotations
 
-from typing import Optional
-
 from fastapi import HTTPException, status
-from sqlalchemy import select, text
+from sqlalchemy import Integer, String, bindparam, exists, func, select, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import invalidate_course_cache
 from app.models.assignment import Assignment
 from app.models.course import Course, Enrolment, EnrolmentStatus
 from app.models.user import User
-from app.schemas.gradebook import Gradebook, GradebookCell, GradebookUpdate
+from app.schemas.gradebook import (
+    Assignment as AssignmentSchema,
+    Gradebook,
+    GradebookCell,
+    GradebookRow,
+    GradebookUpdate,
+)
+
+_UPSERT_SCORE = text("""
+    INSERT INTO assignment_student (assignment_id, student_id, score)
+    SELECT * FROM unnest(
+        CAST(:assignment_ids AS integer[]),
+        CAST(:student_ids AS integer[]),
+        CAST(:scores AS integer[])
+    )
+    ON CONFLICT (assignment_id, student_id)
+    DO UPDATE SET score = EXCLUDED.score, updated_at = now()
+    RETURNING student_id, assignment_id, score
+""")
+
+_GRADEBOOK_SQL = """
+    SELECT
+        u.id AS student_id,
+        u.first_name || ' ' || u.last_name AS student_name,
+        jsonb_object_agg(g.assignment_id, g.score) AS scores
+    FROM v_gradebook g
+    JOIN users u ON u.id = g.student_id
+    WHERE g.course_id = :course_id {student_filter}
+    GROUP BY u.id, u.first_name, u.last_name
+    ORDER BY u.id
+"""
+_GRADEBOOK_COLUMNS = {
+    "student_id": Integer,
+    "student_name": String,
+    "scores": JSONB,
+}
+_GRADEBOOK_ROWS = text(_GRADEBOOK_SQL.format(student_filter="")).columns(
+    **_GRADEBOOK_COLUMNS
+)
+_GRADEBOOK_OWN_ROW = text(
+    _GRADEBOOK_SQL.format(student_filter="AND g.student_id = :student_id")
+).columns(**_GRADEBOOK_COLUMNS)
+
+_COURSE_EXISTS = select(exists().where(Course.id == bindparam("course_id")))
+_COURSE_ASSIGNMENTS = select(Assignment).where(
+    Assignment.course_id == bindparam("course_id")
+)
+
+_ENROLLED_COUNT = (
+    select(func.count())
+    .where(
+        Enrolment.course_id == bindparam("course_id"),
+        Enrolment.user_id.in_(bindparam("student_ids", expanding=True)),
+        Enrolment.status == EnrolmentStatus.ACTIVE,
+    )
+    .scalar_subquery()
+)
+_ASSIGNMENT_COUNT = (
+    select(func.count())
+    .where(
+        Assignment.course_id == bindparam("course_id"),
+        Assignment.id.in_(bindparam("assignment_ids", expanding=True)),
+    )
+    .scalar_subquery()
+)
+_UPDATE_CHECKS = select(
+    exists().where(Course.id == bindparam("course_id")).label("course_exists"),
+    _ENROLLED_COUNT.label("enrolled"),
+    _ASSIGNMENT_COUNT.label("valid_assignments"),
+)
 
 
 async def get_gradebook(
@@ -19,68 +88,45 @@ async def get_gradebook(
 ) -> Gradebook:
     """Get gradebook for a course."""
     # Check course exists and user has access
-    result = await db.execute(select(Course).where(Course.id == course_id))
-    course = result.scalar_one_or_none()
-    if not course:
+    course_exists = await db.scalar(_COURSE_EXISTS, {"course_id": course_id})
+    if not course_exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Course not found",
         )
 
     # Get assignments
-    result = await db.execute(
-        select(Assignment).where(Assignment.course_id == course_id)
-    )
+    result = await db.execute(_COURSE_ASSIGNMENTS, {"course_id": course_id})
     assignments = result.scalars().all()
 
-    # Get gradebook data
-    query = text("""
-        SELECT 
-            u.id as student_id,
-            u.first_name || ' ' || u.last_name as student_name,
-            a.id as assignment_id,
-            g.score
-        FROM v_gradebook g
-        JOIN users u ON u.id = g.student_id
-        JOIN assignments a ON a.id = g.assignment_id
-        WHERE g.course_id = :course_id
-        ORDER BY u.id, a.id
-    """)
-    result = await db.execute(query, {"course_id": course_id})
+    # Get gradebook rows, scores aggregated per student by the database
+    if current_user.is_teacher:
+        result = await db.execute(_GRADEBOOK_ROWS, {"course_id": course_id})
+    else:
+        # Student can only see their own row
+        result = await db.execute(
+            _GRADEBOOK_OWN_ROW,
+            {"course_id": course_id, "student_id": current_user.id},
+        )
     rows = result.all()
+    if not rows and not current_user.is_teacher:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enrolled in course",
+        )
 
-    # Format data
-    student_scores: dict[int, dict[int, Optional[int]]] = {}
-    for row in rows:
-        if row.student_id not in student_scores:
-            student_scores[row.student_id] = {
-                "name": row.student_name,
-                "scores": {},
-            }
-        student_scores[row.student_id]["scores"][row.assignment_id] = row.score
-
-    # Filter rows based on user role
-    if not any(r.name == "teacher" for r in current_user.roles):
-        # Student can only see their own row
-        if current_user.id not in student_scores:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not enrolled in course",
-            )
-        student_scores = {current_user.id: student_scores[current_user.id]}
-
-    # Format response
+    # Format response from trusted DB data, skipping validation
     gradebook_rows = [
-        {
-            "student_id": student_id,
-            "student_name": data["name"],
-            "scores": data["scores"],
-        }
-        for student_id, data in student_scores.items()
+        GradebookRow.model_construct(
+            student_id=row.student_id,
+            student_name=row.student_name,
+            scores=row.scores,
+        )
+        for row in rows
     ]
 
-    return Gradebook(
-        assignments=assignments,
+    return Gradebook.model_construct(
+        assignments=[AssignmentSchema.from_orm_fast(a) for a in assignments],
         rows=gradebook_rows,
     )
 
@@ -90,69 +136,67 @@ async def update_gradebook(
     current_user: User,
     course_id: int,
     update: GradebookUpdate,
-) -> None:
-    """Update gradebook scores."""
-    # Check course exists and user is teacher
-    result = await db.execute(select(Course).where(Course.id == course_id))
-    course = result.scalar_one_or_none()
-    if not course:
+) -> list[GradebookCell]:
+    """Update gradebook scores and return the stored cells."""
+    # Keep the last value per cell; one upsert cannot touch a row twice
+    cells = list(
+        {(c.assignment_id, c.student_id): c for c in update.updates}.values()
+    )
+
+    # Check the course and validate the cells in a single round trip
+    student_ids = {cell.student_id for cell in cells}
+    assignment_ids = {cell.assignment_id for cell in cells}
+    result = await db.execute(
+        _UPDATE_CHECKS,
+        {
+            "course_id": course_id,
+            "student_ids": list(student_ids),
+            "assignment_ids": list(assignment_ids),
+        },
+    )
+    checks = result.one()
+
+    if not checks.course_exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Course not found",
         )
 
-    if not any(r.name == "teacher" for r in current_user.roles):
+    if not current_user.is_teacher:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
 
     # Validate all students are enrolled
-    student_ids = {cell.student_id for cell in update.updates}
-    result = await db.execute(
-        select(Enrolment).where(
-            Enrolment.course_id == course_id,
-            Enrolment.user_id.in_(student_ids),
-            Enrolment.status == EnrolmentStatus.ACTIVE,
-        )
-    )
-    enrolled_students = {e.user_id for e in result.scalars().all()}
-    if not enrolled_students.issuperset(student_ids):
+    if checks.enrolled != len(student_ids):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Some students are not enrolled in the course",
         )
 
     # Validate all assignments belong to the course
-    assignment_ids = {cell.assignment_id for cell in update.updates}
-    result = await db.execute(
-        select(Assignment).where(
-            Assignment.course_id == course_id,
-            Assignment.id.in_(assignment_ids),
-        )
-    )
-    course_assignments = {a.id for a in result.scalars().all()}
-    if not course_assignments.issuperset(assignment_ids):
+    if checks.valid_assignments != len(assignment_ids):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Some assignments do not belong to the course",
         )
 
-    # Update scores
-    for cell in update.updates:
-        query = text("""
-            INSERT INTO assignment_student (assignment_id, student_id, score)
-            VALUES (:assignment_id, :student_id, :score)
-            ON CONFLICT (assignment_id, student_id)
-            DO UPDATE SET score = :score
-        """)
-        await db.execute(
-            query,
-            {
-                "assignment_id": cell.assignment_id,
-                "student_id": cell.student_id,
-                "score": cell.score,
-            },
-        )
+    if not cells:
+        return []
+
+    # Update scores in one statement, binding each column as an array
+    result = await db.execute(
+        _UPSERT_SCORE,
+        {
+            "assignment_ids": [cell.assignment_id for cell in cells],
+            "student_ids": [cell.student_id for cell in cells],
+            "scores": [cell.score for cell in cells],
+        },
+    )
+
+    stored = [GradebookCell(*row) for row in result]
 
-    await db.commit() 
\ No newline at end of file
+    await db.commit()
+    await invalidate_course_cache(course_id)
+    return stored 
\ No newline at end of file
@@ -4,17 +4,24 @@ import asyncio
 from datetime import datetime, timedelta
 from typing import Optional
 
-import bleach
+import nh3
+import orjson
 from fastapi import HTTPException, WebSocket
-from sqlalchemy import select
+from sqlalchemy import exists, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import raiseload
 
-from app.core.redis import get_redis
+from app.core import rate_limit
+from app.core.ws_batch import BatchedSender
 from app.models.course import Course, Enrolment, EnrolmentStatus
 from app.models.message import Dialog, Message
 from app.models.user import User
-from app.schemas.message import MessageCreate, MessageUpdate
+from app.schemas.message import MessageCreate, MessageInDB, MessageUpdate
+
+# Message body sanitizer allowlist
+ALLOWED_TAGS = {"p", "br", "b", "i", "em", "strong", "a"}
+ALLOWED_ATTRS = {"a": {"href", "title"}}
 
 
 async def get_dialog(
@@ -31,7 +38,7 @@ async def get_dialog(
             Dialog.teacher_id == teacher_id,
             Dialog.student_id == student_id,
         )
-        .options(selectinload(Dialog.messages))
+        .options(raiseload("*"))
     )
     result = await db.execute(stmt)
     return result.scalar_one_or_none()
@@ -44,33 +51,39 @@ async def create_dialog(
     student_id: int,
 ) -> Dialog:
     """Create a new dialog between teacher and student for a course."""
-    # Verify course exists and user is enrolled
-    course = await db.get(Course, course_id)
-    if not course:
-        raise HTTPException(status_code=404, detail="Course not found")
-
-    # Verify student is enrolled in course
-    stmt = select(Enrolment).where(
+    # Insert only if the student is enrolled; a concurrent insert is a no-op
+    enrolled = exists().where(
         Enrolment.course_id == course_id,
         Enrolment.user_id == student_id,
         Enrolment.status == EnrolmentStatus.ACTIVE,
     )
-    result = await db.execute(stmt)
-    if not result.scalar_one_or_none():
-        raise HTTPException(
-            status_code=403, detail="Student is not enrolled in this course"
+    stmt = (
+        pg_insert(Dialog)
+        .from_select(
+            ["course_id", "teacher_id", "student_id"],
+            select(
+                literal(course_id), literal(teacher_id), literal(student_id)
+            ).where(enrolled),
         )
-
-    # Create dialog
-    dialog = Dialog(
-        course_id=course_id,
-        teacher_id=teacher_id,
-        student_id=student_id,
+        .on_conflict_do_nothing(
+            index_elements=["course_id", "teacher_id", "student_id"]
+        )
+        .returning(Dialog)
     )
-    db.add(dialog)
+    dialog = await db.scalar(stmt)
     await db.commit()
-    await db.refresh(dialog)
-    return dialog
+    if dialog:
+        return dialog
+
+    # Nothing inserted: lost a race, or the checks failed
+    dialog = await get_dialog(db, course_id, teacher_id, student_id)
+    if dialog:
+        return dialog
+    if not await db.scalar(select(exists().where(Course.id == course_id))):
+        raise HTTPException(status_code=404, detail="Course not found")
+    raise HTTPException(
+        status_code=403, detail="Student is not enrolled in this course"
+    )
 
 
 async def get_or_create_dialog(
@@ -112,7 +125,7 @@ async def create_message(
 ) -> Message:
     """Create a new message in a dialog."""
     # Get dialog
-    dialog = await db.get(Dialog, dialog_id)
+    dialog = await db.get(Dialog, dialog_id, options=[raiseload("*")])
     if not dialog:
         raise HTTPException(status_code=404, detail="Dialog not found")
 
@@ -121,35 +134,30 @@ async def create_message(
         raise HTTPException(status_code=403, detail="Not authorized to send messages")
 
     # Rate limiting
-    redis = await get_redis()
-    key = f"message_rate:{sender_id}"
-    count = await redis.incr(key)
-    if count == 1:
-        await redis.expire(key, 60)  # 60 seconds window
+    count = await rate_limit.hit(f"message_rate:{sender_id}", 60)  # 60s window
     if count > 5:  # 5 messages per minute
         raise HTTPException(
             status_code=429, detail="Rate limit exceeded. Please try again later."
         )
 
     # Sanitize message body (allow only safe markdown subset)
-    allowed_tags = ["p", "br", "b", "i", "em", "strong", "a"]
-    allowed_attrs = {"a": ["href", "title"]}
-    sanitized_body = bleach.clean(
+    sanitized_body = nh3.clean(
         message.body,
-        tags=allowed_tags,
-        attributes=allowed_attrs,
-        strip=True,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRS,
     )
 
     # Create message
-    db_message = Message(
-        dialog_id=dialog_id,
-        sender_id=sender_id,
-        body=sanitized_body,
+    db_message = await db.scalar(
+        insert(Message)
+        .values(
+            dialog_id=dialog_id,
+            sender_id=sender_id,
+            body=sanitized_body,
+        )
+        .returning(Message)
     )
-    db.add(db_message)
     await db.commit()
-    await db.refresh(db_message)
     return db_message
 
 
@@ -159,15 +167,19 @@ async def update_message(
     message: MessageUpdate,
 ) -> Message:
     """Update a message."""
-    db_message = await db.get(Message, message_id)
+    values = message.dict(exclude_unset=True)
+    if values:
+        db_message = await db.scalar(
+            update(Message)
+            .where(Message.id == message_id)
+            .values(**values)
+            .returning(Message)
+        )
+        await db.commit()
+    else:
+        db_message = await db.get(Message, message_id)
     if not db_message:
         raise HTTPException(status_code=404, detail="Message not found")
-
-    for field, value in message.dict(exclude_unset=True).items():
-        setattr(db_message, field, value)
-
-    await db.commit()
-    await db.refresh(db_message)
     return db_message
 
 
@@ -178,19 +190,16 @@ async def mark_messages_as_read(
 ) -> None:
     """Mark all unread messages in dialog as read for user."""
     stmt = (
-        select(Message)
+        update(Message)
         .where(
             Message.dialog_id == dialog_id,
             Message.sender_id != user_id,
-            Message.read == False,
+            Message.read.is_(False),
         )
+        .values(read=True)
+        .execution_options(synchronize_session=False)
     )
-    result = await db.execute(stmt)
-    messages = result.scalars().all()
-
-    for message in messages:
-        message.read = True
-
+    await db.execute(stmt)
     await db.commit()
 
 
@@ -202,7 +211,7 @@ async def handle_websocket(
 ) -> None:
     """Handle websocket connection for chat."""
     # Get dialog
-    dialog = await db.get(Dialog, dialog_id)
+    dialog = await db.get(Dialog, dialog_id, options=[raiseload("*")])
     if not dialog:
         await websocket.close(code=4004)
         return
@@ -213,11 +222,12 @@ async def handle_websocket(
         return
 
     await websocket.accept()
+    sender = BatchedSender(websocket)
 
     try:
         while True:
             # Receive message
-            data = await websocket.receive_json()
+            data = orjson.loads(await websocket.receive_text())
             message = MessageCreate(**data)
 
             # Create message
@@ -226,9 +236,11 @@ async def handle_websocket(
             # Mark other messages as read
             await mark_messages_as_read(db, dialog_id, user.id)
 
-            # Send message back
-            await websocket.send_json(db_message.dict())
+            # Queue message for the next outgoing frame
+            sender.send(MessageInDB.model_validate(db_message).model_dump())
 
     except Exception as e:
         await websocket.close(code=1011)
-        raise e 
\ No newline at end of file
+        raise e
+    finally:
+        sender.close() 
\ No newline at end of file
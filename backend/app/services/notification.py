@@ -4,13 +4,19 @@ import asyncio
 from datetime import datetime
 from typing import Optional
 
+import orjson
 from fastapi import WebSocket
-from sqlalchemy import select
+from sqlalchemy import insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.redis import get_redis
+from app.core.ws_batch import BatchedSender
 from app.models.notification import Notification, NotificationType
-from app.schemas.notification import NotificationCreate, NotificationUpdate
+from app.schemas.notification import (
+    NotificationCreate,
+    NotificationInDB,
+    NotificationUpdate,
+)
 
 
 async def create_notification(
@@ -18,10 +24,12 @@ async def create_notification(
     notification: NotificationCreate,
 ) -> Notification:
     """Create a new notification."""
-    db_notification = Notification(**notification.dict())
-    db.add(db_notification)
+    db_notification = await db.scalar(
+        insert(Notification)
+        .values(**notification.dict())
+        .returning(Notification)
+    )
     await db.commit()
-    await db.refresh(db_notification)
     return db_notification
 
 
@@ -49,15 +57,17 @@ async def update_notification(
     notification: NotificationUpdate,
 ) -> Notification:
     """Update a notification."""
-    db_notification = await db.get(Notification, notification_id)
-    if not db_notification:
-        return None
-
-    for field, value in notification.dict(exclude_unset=True).items():
-        setattr(db_notification, field, value)
-
+    values = notification.dict(exclude_unset=True)
+    if not values:
+        return await db.get(Notification, notification_id)
+
+    db_notification = await db.scalar(
+        update(Notification)
+        .where(Notification.id == notification_id)
+        .values(**values)
+        .returning(Notification)
+    )
     await db.commit()
-    await db.refresh(db_notification)
     return db_notification
 
 
@@ -66,16 +76,16 @@ async def mark_notifications_as_delivered(
     user_id: int,
 ) -> None:
     """Mark all undelivered notifications as delivered for a user."""
-    stmt = select(Notification).where(
-        Notification.user_id == user_id,
-        Notification.delivered == False,
+    stmt = (
+        update(Notification)
+        .where(
+            Notification.user_id == user_id,
+            Notification.delivered.is_(False),
+        )
+        .values(delivered=True)
+        .execution_options(synchronize_session=False)
     )
-    result = await db.execute(stmt)
-    notifications = result.scalars().all()
-
-    for notification in notifications:
-        notification.delivered = True
-
+    await db.execute(stmt)
     await db.commit()
 
 
@@ -143,31 +153,41 @@ class ConnectionManager:
     """WebSocket connection manager."""
 
     def __init__(self):
-        self.active_connections: dict[int, list[WebSocket]] = {}
+        self.active_connections: dict[int, set[WebSocket]] = {}
+        self.senders: dict[WebSocket, BatchedSender] = {}
 
     async def connect(self, websocket: WebSocket, user_id: int) -> None:
         """Connect a new WebSocket."""
         await websocket.accept()
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
+        self.active_connections.setdefault(user_id, set()).add(websocket)
+        self.senders[websocket] = BatchedSender(websocket)
 
     def disconnect(self, websocket: WebSocket, user_id: int) -> None:
         """Disconnect a WebSocket."""
-        if user_id in self.active_connections:
-            self.active_connections[user_id].remove(websocket)
-            if not self.active_connections[user_id]:
+        sender = self.senders.pop(websocket, None)
+        if sender:
+            sender.close()
+        connections = self.active_connections.get(user_id)
+        if connections is not None:
+            connections.discard(websocket)
+            if not connections:
                 del self.active_connections[user_id]
 
     async def send_notification(self, user_id: int, notification: Notification) -> None:
-        """Send notification to all user's WebSocket connections."""
-        if user_id in self.active_connections:
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_json(notification.dict())
-                except Exception:
-                    # Remove failed connection
-                    self.disconnect(connection, user_id)
+        """Queue notification for all user's WebSocket connections."""
+        if user_id not in self.active_connections:
+            return
+        # Serialize once for all of the user's connections
+        payload = orjson.Fragment(
+            NotificationInDB.model_validate(notification).model_dump_json()
+        )
+        for connection in list(self.active_connections[user_id]):
+            sender = self.senders[connection]
+            if sender.closed:
+                # Remove failed connection
+                self.disconnect(connection, user_id)
+            else:
+                sender.send(payload)
 
 
 # Global connection manager
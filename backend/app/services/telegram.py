@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 import asyncio
-from datetime import datetime, timedelta
 from typing import Optional
 
+import msgspec
+import orjson
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from telegram import Update
 from telegram.ext import (
@@ -17,6 +18,7 @@ from telegram.ext import (
     filters,
 )
 
+from app.core import rate_limit
 from app.core.config import settings
 from app.core.redis import get_redis
 from app.models.course import Course, Enrolment, EnrolmentStatus
@@ -31,6 +33,29 @@ WAITING_TOKEN = 1
 GLOBAL_RATE_LIMIT = 100  # requests per minute
 USER_RATE_LIMIT = 20  # requests per minute
 TOKEN_TTL = 15 * 60  # 15 minutes in seconds
+COURSES_CACHE_TTL = 30  # seconds
+
+# Hits under this share of a limit are first counted in-process, then flushed
+# to Redis, which stays authoritative for the shared, cross-worker count
+LOCAL_FRACTION = 0.8
+_local_hits = rate_limit.LocalWindow(60)
+
+# Report messages
+# TODO: Replace placeholders with actual pending assignments, summaries,
+# grades and deadlines
+PENDING_HEADER = "Your pending assignments:\n\n"
+PENDING_PLACEHOLDER = "No pending assignments"
+SUMMARY_HEADER = "Your course summary:\n\n"
+SUMMARY_PLACEHOLDER = "No data available"
+GRADES_HEADER = "Your grades:\n\n"
+GRADES_PLACEHOLDER = "No grades available"
+DEADLINES_HEADER = "Upcoming deadlines:\n\n"
+DEADLINES_PLACEHOLDER = "No upcoming deadlines"
+
+
+def _format_courses(header: str, placeholder: str, titles: list[str]) -> str:
+    """Format a per-course report in a single join."""
+    return header + "".join(f"*{title}*\n{placeholder}\n\n" for title in titles)
 
 
 class TelegramBot:
@@ -61,27 +86,66 @@ class TelegramBot:
 
     async def _check_rate_limit(self, user_id: Optional[int] = None) -> bool:
         """Check rate limits."""
-        redis = await get_redis()
+        keys = ["telegram:rate_limit:global"]
+        if user_id:
+            keys.append(f"telegram:rate_limit:user:{user_id}")
+
+        # Well below the limits in this process: skip Redis entirely
+        limits = (GLOBAL_RATE_LIMIT, USER_RATE_LIMIT)
+        if all(
+            _local_hits.count(key) < LOCAL_FRACTION * limit
+            for key, limit in zip(keys, limits)
+        ):
+            for key in keys:
+                _local_hits.add(key)
+            return True
+
+        # Global and user counters in one round trip, flushing the hits this
+        # process absorbed locally so Redis still sees every request
+        for key in keys:
+            _local_hits.add(key)
+        amounts = [_local_hits.take_pending(key) for key in keys]
+        counts = await rate_limit.hit_many(keys, 60, amounts)
 
         # Global rate limit
-        global_key = "telegram:rate_limit:global"
-        global_count = await redis.incr(global_key)
-        if global_count == 1:
-            await redis.expire(global_key, 60)
-        if global_count > GLOBAL_RATE_LIMIT:
+        if counts[0] > GLOBAL_RATE_LIMIT:
             return False
 
         # User rate limit
-        if user_id:
-            user_key = f"telegram:rate_limit:user:{user_id}"
-            user_count = await redis.incr(user_key)
-            if user_count == 1:
-                await redis.expire(user_key, 60)
-            if user_count > USER_RATE_LIMIT:
-                return False
+        if user_id and counts[1] > USER_RATE_LIMIT:
+            return False
 
         return True
 
+    async def _course_titles(self, telegram_id: int) -> Optional[list[str]]:
+        """Get active course titles for a bound user, or None if unbound."""
+        redis = await get_redis()
+        cache_key = f"telegram:courses:{telegram_id}"
+        cached = await redis.get(cache_key)
+        if cached is not None:
+            return orjson.loads(cached)
+
+        # User and active courses in one query
+        stmt = (
+            select(User.id, Course.title)
+            .outerjoin(
+                Enrolment,
+                and_(
+                    Enrolment.user_id == User.id,
+                    Enrolment.status == EnrolmentStatus.ACTIVE,
+                ),
+            )
+            .outerjoin(Course, Course.id == Enrolment.course_id)
+            .where(User.telegram_id == telegram_id)
+        )
+        rows = (await self.db.execute(stmt)).all()
+        if not rows:
+            return None
+
+        titles = [row.title for row in rows if row.title is not None]
+        await redis.set(cache_key, orjson.dumps(titles), ex=COURSES_CACHE_TTL)
+        return titles
+
     async def _start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         """Handle /start command."""
         if not await self._check_rate_limit(update.effective_user.id):
@@ -102,25 +166,25 @@ class TelegramBot:
         token = update.message.text
         redis = await get_redis()
 
-        # Get token data
+        # Get and consume token data in one round trip
         token_key = f"telegram:bind_token:{token}"
-        token_data = await redis.get(token_key)
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.get(token_key)
+            pipe.delete(token_key)
+            token_data, _ = await pipe.execute()
         if not token_data:
             await update.message.reply_text("Invalid or expired token. Please try again.")
             return ConversationHandler.END
 
-        # Parse token data
+        # Parse token data, written by the bind-token endpoint
         try:
-            token_data = TelegramBindToken.parse_raw(token_data)
-        except Exception:
+            token_data = TelegramBindToken.model_construct(
+                **msgspec.msgpack.decode(token_data)
+            )
+        except (msgspec.DecodeError, TypeError):
             await update.message.reply_text("Invalid token format. Please try again.")
             return ConversationHandler.END
 
-        # Check token TTL
-        if datetime.utcnow() > token_data.expires_at:
-            await update.message.reply_text("Token has expired. Please generate a new one.")
-            return ConversationHandler.END
-
         # Get user
         stmt = select(User).where(User.id == token_data.user_id)
         result = await self.db.execute(stmt)
@@ -132,9 +196,7 @@ class TelegramBot:
         # Update user's Telegram ID
         user.telegram_id = update.effective_user.id
         await self.db.commit()
-
-        # Delete used token
-        await redis.delete(token_key)
+        await redis.delete(f"telegram:courses:{user.telegram_id}")
 
         await update.message.reply_text(
             "Your Telegram account has been successfully bound to your profile!"
@@ -152,34 +214,21 @@ class TelegramBot:
             await update.message.reply_text("Rate limit exceeded. Please try again later.")
             return
 
-        # Get user
-        stmt = select(User).where(User.telegram_id == update.effective_user.id)
-        result = await self.db.execute(stmt)
-        user = result.scalar_one_or_none()
-        if not user:
+        # Get user's courses
+        titles = await self._course_titles(update.effective_user.id)
+        if titles is None:
             await update.message.reply_text("Please bind your Telegram account first using /start.")
             return
 
-        # Get pending assignments
-        stmt = select(Course).join(Enrolment).where(
-            Enrolment.user_id == user.id,
-            Enrolment.status == EnrolmentStatus.ACTIVE,
-        )
-        result = await self.db.execute(stmt)
-        courses = result.scalars().all()
-
-        if not courses:
+        if not titles:
             await update.message.reply_text("You have no pending assignments.")
             return
 
         # Format response
-        response = "Your pending assignments:\n\n"
-        for course in courses:
-            response += f"*{course.title}*\n"
-            # TODO: Add actual pending assignments
-            response += "No pending assignments\n\n"
-
-        await update.message.reply_text(response, parse_mode="Markdown")
+        await update.message.reply_text(
+            _format_courses(PENDING_HEADER, PENDING_PLACEHOLDER, titles),
+            parse_mode="Markdown",
+        )
 
     async def _summary_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle /summary command."""
@@ -187,34 +236,21 @@ class TelegramBot:
             await update.message.reply_text("Rate limit exceeded. Please try again later.")
             return
 
-        # Get user
-        stmt = select(User).where(User.telegram_id == update.effective_user.id)
-        result = await self.db.execute(stmt)
-        user = result.scalar_one_or_none()
-        if not user:
+        # Get user's courses
+        titles = await self._course_titles(update.effective_user.id)
+        if titles is None:
             await update.message.reply_text("Please bind your Telegram account first using /start.")
             return
 
-        # Get courses
-        stmt = select(Course).join(Enrolment).where(
-            Enrolment.user_id == user.id,
-            Enrolment.status == EnrolmentStatus.ACTIVE,
-        )
-        result = await self.db.execute(stmt)
-        courses = result.scalars().all()
-
-        if not courses:
+        if not titles:
             await update.message.reply_text("You are not enrolled in any courses.")
             return
 
         # Format response
-        response = "Your course summary:\n\n"
-        for course in courses:
-            response += f"*{course.title}*\n"
-            # TODO: Add actual course summary
-            response += "No data available\n\n"
-
-        await update.message.reply_text(response, parse_mode="Markdown")
+        await update.message.reply_text(
+            _format_courses(SUMMARY_HEADER, SUMMARY_PLACEHOLDER, titles),
+            parse_mode="Markdown",
+        )
 
     async def _mygrades_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle /mygrades command."""
@@ -222,34 +258,21 @@ class TelegramBot:
             await update.message.reply_text("Rate limit exceeded. Please try again later.")
             return
 
-        # Get user
-        stmt = select(User).where(User.telegram_id == update.effective_user.id)
-        result = await self.db.execute(stmt)
-        user = result.scalar_one_or_none()
-        if not user:
+        # Get user's courses
+        titles = await self._course_titles(update.effective_user.id)
+        if titles is None:
             await update.message.reply_text("Please bind your Telegram account first using /start.")
             return
 
-        # Get courses
-        stmt = select(Course).join(Enrolment).where(
-            Enrolment.user_id == user.id,
-            Enrolment.status == EnrolmentStatus.ACTIVE,
-        )
-        result = await self.db.execute(stmt)
-        courses = result.scalars().all()
-
-        if not courses:
+        if not titles:
             await update.message.reply_text("You are not enrolled in any courses.")
             return
 
         # Format response
-        response = "Your grades:\n\n"
-        for course in courses:
-            response += f"*{course.title}*\n"
-            # TODO: Add actual grades
-            response += "No grades available\n\n"
-
-        await update.message.reply_text(response, parse_mode="Markdown")
+        await update.message.reply_text(
+            _format_courses(GRADES_HEADER, GRADES_PLACEHOLDER, titles),
+            parse_mode="Markdown",
+        )
 
     async def _deadlines_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle /deadlines command."""
@@ -257,34 +280,21 @@ class TelegramBot:
             await update.message.reply_text("Rate limit exceeded. Please try again later.")
             return
 
-        # Get user
-        stmt = select(User).where(User.telegram_id == update.effective_user.id)
-        result = await self.db.execute(stmt)
-        user = result.scalar_one_or_none()
-        if not user:
+        # Get user's courses
+        titles = await self._course_titles(update.effective_user.id)
+        if titles is None:
             await update.message.reply_text("Please bind your Telegram account first using /start.")
             return
 
-        # Get courses
-        stmt = select(Course).join(Enrolment).where(
-            Enrolment.user_id == user.id,
-            Enrolment.status == EnrolmentStatus.ACTIVE,
-        )
-        result = await self.db.execute(stmt)
-        courses = result.scalars().all()
-
-        if not courses:
+        if not titles:
             await update.message.reply_text("You are not enrolled in any courses.")
             return
 
         # Format response
-        response = "Upcoming deadlines:\n\n"
-        for course in courses:
-            response += f"*{course.title}*\n"
-            # TODO: Add actual deadlines
-            response += "No upcoming deadlines\n\n"
-
-        await update.message.reply_text(response, parse_mode="Markdown")
+        await update.message.reply_text(
+            _format_courses(DEADLINES_HEADER, DEADLINES_PLACEHOLDER, titles),
+            parse_mode="Markdown",
+        )
 
     async def start(self) -> None:
         """Start the bot."""
@@ -15,9 +15,11 @@ export const useChatStore = defineStore('chat', () => {
     ws.value = new WebSocket(`ws://localhost:8000/api/v1/ws/chat?token=${token}`)
 
     ws.value.onmessage = (event) => {
-      const message = JSON.parse(event.data)
-      if (message.dialog_id === currentDialog.value?.id) {
-        messages.value.push(message)
+      // Frames carry a JSON array of messages batched by the server
+      for (const message of JSON.parse(event.data)) {
+        if (message.dialog_id === currentDialog.value?.id) {
+          messages.value.push(message)
+        }
       }
     }
 
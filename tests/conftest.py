@@ -1,28 +1,60 @@
 from __future__ import annotations
 
 import asyncio
-from typing import AsyncGenerator, Generator
+from contextlib import AbstractContextManager, contextmanager
+from typing import AsyncGenerator, Callable, Generator, Iterator
 
 import pytest
 import pytest_asyncio
-from httpx import AsyncClient
+from argon2 import PasswordHasher
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event, insert
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import make_transient_to_detached, sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from app.core.config import get_settings
+from app.core import security
+from app.core.cache import CACHE_PREFIX
+from app.core.security import create_access_token, get_password_hash
 from app.db.base import Base
 from app.db.session import get_db
 from app.main import app
+from app.models.course import Course, Enrolment, EnrolmentStatus
+from app.models.role import Role
+from app.models.user import User
 
 settings = get_settings()
 
-# Use in-memory SQLite for testing
+# Use in-memory SQLite for testing; each xdist worker gets its own database
 TEST_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
+# One shared connection, so every session sees the same in-memory database
 engine = create_async_engine(
     TEST_SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
 )
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Skip durability work the throwaway test database doesn't need."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=MEMORY")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.close()
+    # Let SQLAlchemy emit BEGIN itself so per-test SAVEPOINTs work
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine.sync_engine, "begin")
+def do_begin(conn) -> None:
+    """Start transactions explicitly for pysqlite."""
+    conn.exec_driver_sql("BEGIN")
+
 TestingSessionLocal = sessionmaker(
     engine,
     class_=AsyncSession,
@@ -38,26 +70,193 @@ def event_loop() -> Generator[asyncio.AbstractEventLoop, None, None]:
     loop.close()
 
 
+@pytest.fixture(scope="session", autouse=True)
+def fast_password_hasher() -> Generator[None, None, None]:
+    """Use minimal argon2 cost parameters for the test session."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(
+            security,
+            "_ph",
+            PasswordHasher(time_cost=1, memory_cost=8, parallelism=1),
+        )
+        yield
+
+
+@pytest.fixture(autouse=True)
+def response_cache() -> None:
+    """Cache responses in memory, fresh for every test."""
+    # ASGITransport skips startup events, so init_cache never runs here
+    FastAPICache.init(InMemoryBackend(), prefix=CACHE_PREFIX)
+
+
+@pytest.fixture(scope="session")
+def password_hash(fast_password_hasher: None) -> str:
+    """Hash the shared test password once per session."""
+    return get_password_hash("password123")
+
+
 @pytest_asyncio.fixture(scope="session")
-async def db() -> AsyncGenerator[AsyncSession, None]:
-    """Create a fresh database for each test session."""
+async def schema() -> AsyncGenerator[None, None]:
+    """Create the database schema once per test session."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
-    async with TestingSessionLocal() as session:
-        yield session
+    yield
 
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
 
 
 @pytest_asyncio.fixture
-async def async_client(db: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
-    """Create a fresh client for each test."""
-    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
-        yield db
-
-    app.dependency_overrides[get_db] = override_get_db
-    async with AsyncClient(app=app, base_url="http://test") as client:
-        yield client
-    app.dependency_overrides.clear() 
\ No newline at end of file
+async def db(schema: None) -> AsyncGenerator[AsyncSession, None]:
+    """Run each test in a transaction that is rolled back afterwards."""
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        # Commits inside the test only release a SAVEPOINT
+        session = TestingSessionLocal(
+            bind=conn, join_transaction_mode="create_savepoint"
+        )
+
+        async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+            yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        try:
+            yield session
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            await session.close()
+            await trans.rollback()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def role_ids(schema: None) -> dict[str, int]:
+    """Insert the teacher and student roles once per test session."""
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            insert(Role).returning(Role.name, Role.id),
+            [{"name": "teacher"}, {"name": "student"}],
+        )
+        return dict(result.all())
+
+
+@pytest_asyncio.fixture
+async def roles(db: AsyncSession, role_ids: dict[str, int]) -> dict[str, Role]:
+    """Attach the session's roles to the test session without querying."""
+    attached = {}
+    for name, role_id in role_ids.items():
+        role = Role(id=role_id, name=name)
+        # merge(load=False) only accepts detached instances with a clean state
+        make_transient_to_detached(role)
+        attached[name] = await db.merge(role, load=False)
+    return attached
+
+
+@pytest_asyncio.fixture(scope="session")
+async def async_client() -> AsyncGenerator[AsyncClient, None]:
+    """Create one client shared by the whole session."""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client 
+
+@pytest.fixture
+def auth_as(
+    async_client: AsyncClient,
+) -> Callable[[User], AbstractContextManager[AsyncClient]]:
+    """Send the shared client's requests as a user within a block."""
+
+    @contextmanager
+    def _auth_as(user: User) -> Iterator[AsyncClient]:
+        previous = async_client.headers.get("Authorization")
+        token = create_access_token(user.id)
+        async_client.headers["Authorization"] = f"Bearer {token}"
+        try:
+            yield async_client
+        finally:
+            if previous is None:
+                async_client.headers.pop("Authorization", None)
+            else:
+                async_client.headers["Authorization"] = previous
+
+    return _auth_as
+
+
+@pytest.fixture
+def count_queries() -> Callable[[], AbstractContextManager[list[str]]]:
+    """Record the SQL statements executed within a block."""
+
+    @contextmanager
+    def _count_queries() -> Iterator[list[str]]:
+        queries: list[str] = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            queries.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", record)
+        try:
+            yield queries
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    return _count_queries
+
+
+@pytest.fixture
+async def teacher(
+    db: AsyncSession, password_hash: str, roles: dict[str, Role]
+) -> User:
+    """Create a teacher user."""
+    teacher = User(
+        email="teacher@example.com",
+        first_name="Test",
+        last_name="Teacher",
+        password_hash=password_hash,
+    )
+    teacher.roles.append(roles["teacher"])
+    db.add(teacher)
+    await db.commit()
+    return teacher
+
+
+@pytest.fixture
+async def student(
+    db: AsyncSession, password_hash: str, roles: dict[str, Role]
+) -> User:
+    """Create a student user."""
+    student = User(
+        email="student@example.com",
+        first_name="Test",
+        last_name="Student",
+        password_hash=password_hash,
+    )
+    student.roles.append(roles["student"])
+    db.add(student)
+    await db.commit()
+    return student
+
+
+@pytest.fixture
+async def course(db: AsyncSession, teacher: User) -> Course:
+    """Create a course."""
+    course = Course(
+        title="Test Course",
+        code="TEST101",
+        description="Test course description",
+        owner_id=teacher.id,
+    )
+    db.add(course)
+    await db.commit()
+    return course
+
+
+@pytest.fixture
+async def enrolment(db: AsyncSession, course: Course, student: User) -> Enrolment:
+    """Create an enrolment."""
+    enrolment = Enrolment(
+        user_id=student.id,
+        course_id=course.id,
+        status=EnrolmentStatus.ACTIVE,
+    )
+    db.add(enrolment)
+    await db.commit()
+    return enrolment
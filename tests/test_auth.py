@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 import pytest
+from argon2 import PasswordHasher
 from httpx import AsyncClient
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import get_password_hash
+from app.core import security
 from app.models.role import Role
 from app.models.user import User
 from app.schemas.user import UserCreate
@@ -43,6 +44,7 @@ async def test_register_first_user(
 async def test_register_second_user(
     async_client: AsyncClient,
     db: AsyncSession,
+    password_hash: str,
 ) -> None:
     """Test registering second user (should fail)."""
     # Create admin role and user
@@ -52,7 +54,7 @@ async def test_register_second_user(
         email="admin@example.com",
         first_name="Admin",
         last_name="User",
-        password_hash=get_password_hash("password123"),
+        password_hash=password_hash,
     )
     admin.roles.append(admin_role)
     db.add(admin)
@@ -73,6 +75,7 @@ async def test_register_second_user(
 async def test_login(
     async_client: AsyncClient,
     db: AsyncSession,
+    password_hash: str,
 ) -> None:
     """Test login."""
     # Create user
@@ -80,7 +83,7 @@ async def test_login(
         email="user@example.com",
         first_name="Test",
         last_name="User",
-        password_hash=get_password_hash("password123"),
+        password_hash=password_hash,
     )
     db.add(user)
     await db.commit()
@@ -100,6 +103,7 @@ async def test_login(
 async def test_login_wrong_password(
     async_client: AsyncClient,
     db: AsyncSession,
+    password_hash: str,
 ) -> None:
     """Test login with wrong password."""
     # Create user
@@ -107,7 +111,7 @@ async def test_login_wrong_password(
         email="user@example.com",
         first_name="Test",
         last_name="User",
-        password_hash=get_password_hash("password123"),
+        password_hash=password_hash,
     )
     db.add(user)
     await db.commit()
@@ -124,6 +128,7 @@ async def test_login_wrong_password(
 async def test_refresh_token(
     async_client: AsyncClient,
     db: AsyncSession,
+    password_hash: str,
 ) -> None:
     """Test refresh token."""
     # Create user and login
@@ -131,7 +136,7 @@ async def test_refresh_token(
         email="user@example.com",
         first_name="Test",
         last_name="User",
-        password_hash=get_password_hash("password123"),
+        password_hash=password_hash,
     )
     db.add(user)
     await db.commit()
@@ -158,6 +163,7 @@ async def test_refresh_token(
 async def test_me(
     async_client: AsyncClient,
     db: AsyncSession,
+    password_hash: str,
 ) -> None:
     """Test /me endpoint."""
     # Create user and login
@@ -165,7 +171,7 @@ async def test_me(
         email="user@example.com",
         first_name="Test",
         last_name="User",
-        password_hash=get_password_hash("password123"),
+        password_hash=password_hash,
     )
     db.add(user)
     await db.commit()
@@ -185,4 +191,13 @@ async def test_me(
     data = response.json()
     assert data["email"] == user.email
     assert data["first_name"] == user.first_name
-    assert data["last_name"] == user.last_name 
\ No newline at end of file
+    assert data["last_name"] == user.last_name 
+
+
+def test_password_hashing_default_params(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test hashing with the production argon2 parameters."""
+    monkeypatch.setattr(security, "_ph", PasswordHasher())
+    hashed = security.get_password_hash("password123")
+    assert security.verify_password("password123", hashed)
+    assert not security.verify_password("wrong-password", hashed)
+    assert not security.password_needs_rehash(hashed)
@@ -1,6 +1,6 @@
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy.orm import Session
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud, models, schemas
 from app.core.config import settings
@@ -9,22 +9,31 @@ from tests.utils.course import create_random_course
 from tests.utils.user import create_random_user, get_superuser_token_headers
 from tests.utils.utils import random_lower_string
 
-def test_create_course_role(
-    client: TestClient, superuser_token_headers: dict, db: Session
+@pytest.fixture
+async def owner_and_course(db: AsyncSession) -> tuple:
+    """Create a course together with its owner."""
+    owner = await create_random_user(db)
+    course = await create_random_course(db, owner_id=owner.id)
+    return owner, course
+
+@pytest.mark.asyncio
+async def test_create_course_role(
+    async_client: AsyncClient,
+    superuser_token_headers: dict,
+    db: AsyncSession,
+    owner_and_course: tuple,
 ) -> None:
-    # Create a course owner
-    owner = create_random_user(db)
-    course = create_random_course(db, owner_id=owner.id)
+    owner, course = owner_and_course
     
     # Create a user to assign a role to
-    user = create_random_user(db)
+    user = await create_random_user(db)
     
     data = {
         "user_id": user.id,
         "role": CourseRoleEnum.TEACHER
     }
     
-    response = client.post(
+    response = await async_client.post(
         f"{settings.API_V1_STR}/courses/{course.id}/roles",
         headers=superuser_token_headers,
         json=data,
@@ -35,57 +44,64 @@ def test_create_course_role(
     assert content["role"] == CourseRoleEnum.TEACHER
     assert content["course_id"] == course.id
 
-def test_get_course_roles(
-    client: TestClient, superuser_token_headers: dict, db: Session
+@pytest.mark.asyncio
+async def test_get_course_roles(
+    async_client: AsyncClient,
+    superuser_token_headers: dict,
+    db: AsyncSession,
+    owner_and_course: tuple,
 ) -> None:
-    # Create a course owner
-    owner = create_random_user(db)
-    course = create_random_course(db, owner_id=owner.id)
+    owner, course = owner_and_course
     
     # Create and assign roles
-    teacher = create_random_user(db)
-    assistant = create_random_user(db)
+    teacher = await create_random_user(db)
+    assistant = await create_random_user(db)
     
-    crud.course_role.create_with_course(
+    await crud.course_role.create_with_course(
         db,
         obj_in=schemas.CourseRoleCreate(user_id=teacher.id, role=CourseRoleEnum.TEACHER),
         course_id=course.id
     )
-    crud.course_role.create_with_course(
+    await crud.course_role.create_with_course(
         db,
         obj_in=schemas.CourseRoleCreate(user_id=assistant.id, role=CourseRoleEnum.ASSISTANT),
         course_id=course.id
     )
     
-    response = client.get(
+    response = await async_client.get(
         f"{settings.API_V1_STR}/courses/{course.id}/roles",
         headers=superuser_token_headers,
     )
     assert response.status_code == 200
     content = response.json()
     assert len(content) == 3  # owner + teacher + assistant
-    roles = {item["user_id"]: item["role"] for item in content}
-    assert roles[owner.id] == CourseRoleEnum.OWNER
-    assert roles[teacher.id] == CourseRoleEnum.TEACHER
-    assert roles[assistant.id] == CourseRoleEnum.ASSISTANT
+    # Project the response once and compare it whole
+    roles_by_user = {item["user_id"]: item["role"] for item in content}
+    assert roles_by_user == {
+        owner.id: CourseRoleEnum.OWNER,
+        teacher.id: CourseRoleEnum.TEACHER,
+        assistant.id: CourseRoleEnum.ASSISTANT,
+    }
 
-def test_update_course_role(
-    client: TestClient, superuser_token_headers: dict, db: Session
+@pytest.mark.asyncio
+async def test_update_course_role(
+    async_client: AsyncClient,
+    superuser_token_headers: dict,
+    db: AsyncSession,
+    owner_and_course: tuple,
 ) -> None:
-    # Create a course owner
-    owner = create_random_user(db)
-    course = create_random_course(db, owner_id=owner.id)
+    owner, course = owner_and_course
     
     # Create and assign a role
-    user = create_random_user(db)
-    role = crud.course_role.create_with_course(
+    user = await create_random_user(db)
+    role = await crud.course_role.create_with_course(
         db,
         obj_in=schemas.CourseRoleCreate(user_id=user.id, role=CourseRoleEnum.ASSISTANT),
         course_id=course.id
     )
     
     data = {"role": CourseRoleEnum.TEACHER}
-    response = client.put(
+    response = await async_client.put(
         f"{settings.API_V1_STR}/courses/{course.id}/roles/{user.id}",
         headers=superuser_token_headers,
         json=data,
@@ -96,22 +112,24 @@ def test_update_course_role(
     assert content["role"] == CourseRoleEnum.TEACHER
     assert content["course_id"] == course.id
 
-def test_delete_course_role(
-    client: TestClient, superuser_token_headers: dict, db: Session
+@pytest.mark.asyncio
+async def test_delete_course_role(
+    async_client: AsyncClient,
+    superuser_token_headers: dict,
+    db: AsyncSession,
+    owner_and_course: tuple,
 ) -> None:
-    # Create a course owner
-    owner = create_random_user(db)
-    course = create_random_course(db, owner_id=owner.id)
+    owner, course = owner_and_course
     
     # Create and assign a role
-    user = create_random_user(db)
-    role = crud.course_role.create_with_course(
+    user = await create_random_user(db)
+    role = await crud.course_role.create_with_course(
         db,
         obj_in=schemas.CourseRoleCreate(user_id=user.id, role=CourseRoleEnum.TEACHER),
         course_id=course.id
     )
     
-    response = client.delete(
+    response = await async_client.delete(
         f"{settings.API_V1_STR}/courses/{course.id}/roles/{user.id}",
         headers=superuser_token_headers,
     )
@@ -122,118 +140,65 @@ def test_delete_course_role(
     assert content["course_id"] == course.id
     
     # Verify role is deleted
-    role = crud.course_role.get_by_course_and_user(
+    role = await crud.course_role.get_by_course_and_user(
         db, course_id=course.id, user_id=user.id
     )
     assert role is None
 
-def test_cannot_delete_owner_role(
-    client: TestClient, superuser_token_headers: dict, db: Session
+@pytest.mark.asyncio
+async def test_cannot_delete_owner_role(
+    async_client: AsyncClient,
+    superuser_token_headers: dict,
+    db: AsyncSession,
+    owner_and_course: tuple,
 ) -> None:
-    # Create a course owner
-    owner = create_random_user(db)
-    course = create_random_course(db, owner_id=owner.id)
+    owner, course = owner_and_course
     
-    response = client.delete(
+    response = await async_client.delete(
         f"{settings.API_V1_STR}/courses/{course.id}/roles/{owner.id}",
         headers=superuser_token_headers,
     )
     assert response.status_code == 400
     assert "Cannot delete owner role" in response.json()["detail"]
 
-def test_teacher_cannot_manage_roles(
-    client: TestClient, db: Session
-) -> None:
-    # Create a course owner and teacher
-    owner = create_random_user(db)
-    teacher = create_random_user(db)
-    course = create_random_course(db, owner_id=owner.id)
-    
-    # Assign teacher role
-    crud.course_role.create_with_course(
-        db,
-        obj_in=schemas.CourseRoleCreate(user_id=teacher.id, role=CourseRoleEnum.TEACHER),
-        course_id=course.id
-    )
-    
-    # Get teacher token
-    teacher_token_headers = {"Authorization": f"Bearer {teacher.id}"}
-    
-    # Try to create a role
-    data = {
-        "user_id": create_random_user(db).id,
-        "role": CourseRoleEnum.ASSISTANT
-    }
-    response = client.post(
-        f"{settings.API_V1_STR}/courses/{course.id}/roles",
-        headers=teacher_token_headers,
-        json=data,
-    )
-    assert response.status_code == 403
-    
-    # Try to update a role
-    response = client.put(
-        f"{settings.API_V1_STR}/courses/{course.id}/roles/{teacher.id}",
-        headers=teacher_token_headers,
-        json={"role": CourseRoleEnum.OWNER},
-    )
-    assert response.status_code == 403
-    
-    # Try to delete a role
-    response = client.delete(
-        f"{settings.API_V1_STR}/courses/{course.id}/roles/{teacher.id}",
-        headers=teacher_token_headers,
-    )
-    assert response.status_code == 403
-
-def test_assistant_can_view_roles_but_not_manage(
-    client: TestClient, db: Session
+@pytest.mark.asyncio
+@pytest.mark.parametrize("role", [CourseRoleEnum.TEACHER, CourseRoleEnum.ASSISTANT])
+async def test_non_owner_can_view_roles_but_not_manage(
+    async_client: AsyncClient,
+    db: AsyncSession,
+    owner_and_course: tuple,
+    role: CourseRoleEnum,
 ) -> None:
-    # Create a course owner and assistant
-    owner = create_random_user(db)
-    assistant = create_random_user(db)
-    course = create_random_course(db, owner_id=owner.id)
+    owner, course = owner_and_course
+    member = await create_random_user(db)
     
-    # Assign assistant role
-    crud.course_role.create_with_course(
+    # Assign the role under test
+    await crud.course_role.create_with_course(
         db,
-        obj_in=schemas.CourseRoleCreate(user_id=assistant.id, role=CourseRoleEnum.ASSISTANT),
+        obj_in=schemas.CourseRoleCreate(user_id=member.id, role=role),
         course_id=course.id
     )
     
-    # Get assistant token
-    assistant_token_headers = {"Authorization": f"Bearer {assistant.id}"}
+    # Get member token
+    member_token_headers = {"Authorization": f"Bearer {member.id}"}
+    roles_url = f"{settings.API_V1_STR}/courses/{course.id}/roles"
     
     # Can view roles
-    response = client.get(
-        f"{settings.API_V1_STR}/courses/{course.id}/roles",
-        headers=assistant_token_headers,
-    )
+    response = await async_client.get(roles_url, headers=member_token_headers)
     assert response.status_code == 200
     
-    # Cannot create role
-    data = {
-        "user_id": create_random_user(db).id,
+    # Cannot create, update or delete roles
+    new_role = {
+        "user_id": (await create_random_user(db)).id,
         "role": CourseRoleEnum.ASSISTANT
     }
-    response = client.post(
-        f"{settings.API_V1_STR}/courses/{course.id}/roles",
-        headers=assistant_token_headers,
-        json=data,
-    )
-    assert response.status_code == 403
-    
-    # Cannot update role
-    response = client.put(
-        f"{settings.API_V1_STR}/courses/{course.id}/roles/{assistant.id}",
-        headers=assistant_token_headers,
-        json={"role": CourseRoleEnum.TEACHER},
-    )
-    assert response.status_code == 403
-    
-    # Cannot delete role
-    response = client.delete(
-        f"{settings.API_V1_STR}/courses/{course.id}/roles/{assistant.id}",
-        headers=assistant_token_headers,
-    )
-    assert response.status_code == 403 
\ No newline at end of file
+    mutations = [
+        ("POST", roles_url, new_role),
+        ("PUT", f"{roles_url}/{member.id}", {"role": CourseRoleEnum.OWNER}),
+        ("DELETE", f"{roles_url}/{member.id}", None),
+    ]
+    for method, url, data in mutations:
+        response = await async_client.request(
+            method, url, headers=member_token_headers, json=data
+        )
+        assert response.status_code == 403
@@ -1,57 +1,50 @@
 from __future__ import annotations
 
 import os
-from io import BytesIO
+from contextlib import AbstractContextManager
+from typing import Callable
 
 import pytest
 from httpx import AsyncClient
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import get_password_hash
 from app.models.course import Course, Enrolment, EnrolmentStatus
 from app.models.role import Role
 from app.models.user import User
 from app.schemas.course import CourseCreate
 
+AuthAs = Callable[[User], AbstractContextManager[AsyncClient]]
+CountQueries = Callable[[], AbstractContextManager[list[str]]]
+
 
 @pytest.mark.asyncio
 async def test_create_course(
-    async_client: AsyncClient,
+    auth_as: AuthAs,
     db: AsyncSession,
+    password_hash: str,
+    roles: dict[str, Role],
 ) -> None:
     """Test creating a course."""
-    # Create teacher role and user
-    teacher_role = Role(name="teacher")
-    db.add(teacher_role)
+    # Create teacher
     teacher = User(
         email="teacher@example.com",
         first_name="Test",
         last_name="Teacher",
-        password_hash=get_password_hash("password123"),
+        password_hash=password_hash,
     )
-    teacher.roles.append(teacher_role)
+    teacher.roles.append(roles["teacher"])
     db.add(teacher)
     await db.commit()
 
-    # Login as teacher
-    login_response = await async_client.post(
-        "/auth/login",
-        data={"username": "teacher@example.com", "password": "password123"},
-    )
-    access_token = login_response.json()["access_token"]
-
     # Create course
     course_in = CourseCreate(
         title="Test Course",
         code="TEST101",
         description="Test course description",
     )
-    response = await async_client.post(
-        "/courses",
-        json=course_in.dict(),
-        headers={"Authorization": f"Bearer {access_token}"},
-    )
+    with auth_as(teacher) as client:
+        response = await client.post("/courses", json=course_in.dict())
     assert response.status_code == 201
     data = response.json()
     assert data["title"] == course_in.title
@@ -62,8 +55,9 @@ async def test_create_course(
 
 @pytest.mark.asyncio
 async def test_get_course(
-    async_client: AsyncClient,
+    auth_as: AuthAs,
     db: AsyncSession,
+    password_hash: str,
 ) -> None:
     """Test getting a course."""
     # Create course
@@ -74,17 +68,16 @@ async def test_get_course(
         owner_id=1,  # Assuming user with ID 1 exists
     )
     db.add(course)
-    await db.commit()
 
     # Create student
     student = User(
         email="student@example.com",
         first_name="Test",
         last_name="Student",
-        password_hash=get_password_hash("password123"),
+        password_hash=password_hash,
     )
     db.add(student)
-    await db.commit()
+    await db.flush()
 
     # Enroll student
     enrolment = Enrolment(
@@ -95,18 +88,9 @@ async def test_get_course(
     db.add(enrolment)
     await db.commit()
 
-    # Login as student
-    login_response = await async_client.post(
-        "/auth/login",
-        data={"username": "student@example.com", "password": "password123"},
-    )
-    access_token = login_response.json()["access_token"]
-
     # Get course
-    response = await async_client.get(
-        f"/courses/{course.id}",
-        headers={"Authorization": f"Bearer {access_token}"},
-    )
+    with auth_as(student) as client:
+        response = await client.get(f"/courses/{course.id}")
     assert response.status_code == 200
     data = response.json()
     assert data["title"] == course.title
@@ -117,8 +101,10 @@ async def test_get_course(
 
 @pytest.mark.asyncio
 async def test_upload_material(
-    async_client: AsyncClient,
+    auth_as: AuthAs,
     db: AsyncSession,
+    password_hash: str,
+    roles: dict[str, Role],
 ) -> None:
     """Test uploading course material."""
     # Create course
@@ -129,44 +115,33 @@ async def test_upload_material(
         owner_id=1,  # Assuming user with ID 1 exists
     )
     db.add(course)
-    await db.commit()
 
     # Create teacher
-    teacher_role = Role(name="teacher")
-    db.add(teacher_role)
     teacher = User(
         email="teacher@example.com",
         first_name="Test",
         last_name="Teacher",
-        password_hash=get_password_hash("password123"),
+        password_hash=password_hash,
     )
-    teacher.roles.append(teacher_role)
+    teacher.roles.append(roles["teacher"])
     db.add(teacher)
     await db.commit()
 
-    # Login as teacher
-    login_response = await async_client.post(
-        "/auth/login",
-        data={"username": "teacher@example.com", "password": "password123"},
-    )
-    access_token = login_response.json()["access_token"]
-
     # Create test file
     file_content = b"Test file content"
     files = {
         "file": (
             "test.txt",
-            BytesIO(file_content),
+            file_content,
             "text/plain",
         )
     }
 
     # Upload material
-    response = await async_client.post(
-        f"/courses/{course.id}/materials",
-        files=files,
-        headers={"Authorization": f"Bearer {access_token}"},
-    )
+    with auth_as(teacher) as client:
+        response = await client.post(
+            f"/courses/{course.id}/materials", files=files
+        )
     assert response.status_code == 201
     data = response.json()
     assert data["filename"] == "test.txt"
@@ -181,8 +156,10 @@ async def test_upload_material(
 
 @pytest.mark.asyncio
 async def test_list_materials(
-    async_client: AsyncClient,
+    auth_as: AuthAs,
+    count_queries: CountQueries,
     db: AsyncSession,
+    password_hash: str,
 ) -> None:
     """Test listing course materials."""
     # Create course
@@ -193,17 +170,16 @@ async def test_list_materials(
         owner_id=1,  # Assuming user with ID 1 exists
     )
     db.add(course)
-    await db.commit()
 
     # Create student
     student = User(
         email="student@example.com",
         first_name="Test",
         last_name="Student",
-        password_hash=get_password_hash("password123"),
+        password_hash=password_hash,
     )
     db.add(student)
-    await db.commit()
+    await db.flush()
 
     # Enroll student
     enrolment = Enrolment(
@@ -214,27 +190,21 @@ async def test_list_materials(
     db.add(enrolment)
     await db.commit()
 
-    # Login as student
-    login_response = await async_client.post(
-        "/auth/login",
-        data={"username": "student@example.com", "password": "password123"},
-    )
-    access_token = login_response.json()["access_token"]
-
     # List materials
-    response = await async_client.get(
-        f"/courses/{course.id}/materials",
-        headers={"Authorization": f"Bearer {access_token}"},
-    )
+    with auth_as(student) as client, count_queries() as queries:
+        response = await client.get(f"/courses/{course.id}/materials")
     assert response.status_code == 200
+    # User lookup, access check and one page of materials
+    assert len(queries) <= 4
     data = response.json()
     assert isinstance(data, list)
 
 
 @pytest.mark.asyncio
 async def test_rbac_admin_access(
-    async_client: AsyncClient,
+    auth_as: AuthAs,
     db: AsyncSession,
+    password_hash: str,
 ) -> None:
     """Test RBAC: student cannot access admin endpoints."""
     # Create student
@@ -242,23 +212,14 @@ async def test_rbac_admin_access(
         email="student@example.com",
         first_name="Test",
         last_name="Student",
-        password_hash=get_password_hash("password123"),
+        password_hash=password_hash,
     )
     db.add(student)
     await db.commit()
 
-    # Login as student
-    login_response = await async_client.post(
-        "/auth/login",
-        data={"username": "student@example.com", "password": "password123"},
-    )
-    access_token = login_response.json()["access_token"]
-
     # Try to access admin endpoint
-    response = await async_client.get(
-        "/admin/users",
-        headers={"Authorization": f"Bearer {access_token}"},
-    )
+    with auth_as(student) as client:
+        response = await client.get("/admin/users")
     assert response.status_code == 403
 
 
@@ -266,6 +227,7 @@ async def test_rbac_admin_access(
 async def test_refresh_token_revocation(
     async_client: AsyncClient,
     db: AsyncSession,
+    password_hash: str,
 ) -> None:
     """Test that a revoked refresh token cannot be used."""
     # Create user
@@ -273,7 +235,7 @@ async def test_refresh_token_revocation(
         email="test@example.com",
         first_name="Test",
         last_name="User",
-        password_hash=get_password_hash("password123"),
+        password_hash=password_hash,
     )
     db.add(user)
     await db.commit()
@@ -1,136 +1,25 @@
 from __future__ import annotations
 
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
+from typing import Callable
+
 import pytest
 from httpx import AsyncClient
-from sqlalchemy import select
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import get_password_hash
 from app.models.assignment import Assignment
 from app.models.course import Course, Enrolment, EnrolmentStatus
-from app.models.role import Role
 from app.models.user import User
-from app.schemas.gradebook import AssignmentCreate
-
-
-@pytest.mark.asyncio
-async def test_get_gradebook_teacher(
-    async_client: AsyncClient,
-    db: AsyncSession,
-) -> None:
-    """Test getting gradebook as teacher."""
-    # Create teacher role and user
-    teacher_role = Role(name="teacher")
-    db.add(teacher_role)
-    teacher = User(
-        email="teacher@example.com",
-        first_name="Test",
-        last_name="Teacher",
-        password_hash=get_password_hash("password123"),
-    )
-    teacher.roles.append(teacher_role)
-    db.add(teacher)
-    await db.commit()
 
-    # Create course
-    course = Course(
-        title="Test Course",
-        code="TEST101",
-        description="Test course description",
-        owner_id=teacher.id,
-    )
-    db.add(course)
-    await db.commit()
-
-    # Create assignments
-    assignments = [
-        Assignment(
-            course_id=course.id,
-            title=f"Assignment {i}",
-            description=f"Description {i}",
-            max_score=100,
-        )
-        for i in range(3)
-    ]
-    for assignment in assignments:
-        db.add(assignment)
-    await db.commit()
-
-    # Create students
-    students = []
-    for i in range(3):
-        student = User(
-            email=f"student{i}@example.com",
-            first_name=f"Student{i}",
-            last_name="Test",
-            password_hash=get_password_hash("password123"),
-        )
-        db.add(student)
-        students.append(student)
-    await db.commit()
-
-    # Enroll students
-    for student in students:
-        enrolment = Enrolment(
-            user_id=student.id,
-            course_id=course.id,
-            status=EnrolmentStatus.ACTIVE,
-        )
-        db.add(enrolment)
-    await db.commit()
-
-    # Login as teacher
-    login_response = await async_client.post(
-        "/auth/login",
-        data={"username": "teacher@example.com", "password": "password123"},
-    )
-    access_token = login_response.json()["access_token"]
-
-    # Get gradebook
-    response = await async_client.get(
-        f"/courses/{course.id}/gradebook",
-        headers={"Authorization": f"Bearer {access_token}"},
-    )
-    assert response.status_code == 200
-    data = response.json()
-    assert len(data["assignments"]) == 3
-    assert len(data["rows"]) == 3
-    for row in data["rows"]:
-        assert len(row["scores"]) == 3
-        for score in row["scores"].values():
-            assert score is None
-
-
-@pytest.mark.asyncio
-async def test_get_gradebook_student(
-    async_client: AsyncClient,
-    db: AsyncSession,
-) -> None:
-    """Test getting gradebook as student."""
-    # Create teacher role and user
-    teacher_role = Role(name="teacher")
-    db.add(teacher_role)
-    teacher = User(
-        email="teacher@example.com",
-        first_name="Test",
-        last_name="Teacher",
-        password_hash=get_password_hash("password123"),
-    )
-    teacher.roles.append(teacher_role)
-    db.add(teacher)
-    await db.commit()
+AuthAs = Callable[[User], AbstractContextManager[AsyncClient]]
+CountQueries = Callable[[], AbstractContextManager[list[str]]]
 
-    # Create course
-    course = Course(
-        title="Test Course",
-        code="TEST101",
-        description="Test course description",
-        owner_id=teacher.id,
-    )
-    db.add(course)
-    await db.commit()
 
-    # Create assignment
+@pytest.fixture
+async def assignment(db: AsyncSession, course: Course) -> Assignment:
+    """Create an assignment."""
     assignment = Assignment(
         course_id=course.id,
         title="Test Assignment",
@@ -139,16 +28,20 @@ async def test_get_gradebook_student(
     )
     db.add(assignment)
     await db.commit()
+    return assignment
 
-    # Create student
+
+@pytest.fixture
+async def student(db: AsyncSession, course: Course, password_hash: str) -> User:
+    """Create a student enrolled in the course."""
     student = User(
         email="student@example.com",
         first_name="Test",
         last_name="Student",
-        password_hash=get_password_hash("password123"),
+        password_hash=password_hash,
     )
     db.add(student)
-    await db.commit()
+    await db.flush()
 
     # Enroll student
     enrolment = Enrolment(
@@ -158,199 +51,162 @@ async def test_get_gradebook_student(
     )
     db.add(enrolment)
     await db.commit()
+    return student
 
-    # Login as student
-    login_response = await async_client.post(
-        "/auth/login",
-        data={"username": "student@example.com", "password": "password123"},
-    )
-    access_token = login_response.json()["access_token"]
 
-    # Get gradebook
-    response = await async_client.get(
-        f"/courses/{course.id}/gradebook",
-        headers={"Authorization": f"Bearer {access_token}"},
-    )
-    assert response.status_code == 200
-    data = response.json()
-    assert len(data["assignments"]) == 1
-    assert len(data["rows"]) == 1
-    assert data["rows"][0]["student_id"] == student.id
-    assert len(data["rows"][0]["scores"]) == 1
-    assert data["rows"][0]["scores"][str(assignment.id)] is None
+@dataclass
+class GradebookCtx:
+    """A course with one assignment, its teacher and one enrolled student."""
+
+    teacher: User
+    course: Course
+    assignment: Assignment
+    student: User
+
+    @property
+    def url(self) -> str:
+        return f"/courses/{self.course.id}/gradebook"
+
+
+@pytest.fixture
+def gradebook(
+    teacher: User, course: Course, assignment: Assignment, student: User
+) -> GradebookCtx:
+    """Bundle the shared gradebook setup."""
+    return GradebookCtx(teacher, course, assignment, student)
 
 
 @pytest.mark.asyncio
-async def test_update_gradebook(
-    async_client: AsyncClient,
+async def test_get_gradebook_teacher(
+    auth_as: AuthAs,
+    count_queries: CountQueries,
     db: AsyncSession,
+    password_hash: str,
+    teacher: User,
+    course: Course,
 ) -> None:
-    """Test updating gradebook."""
-    # Create teacher role and user
-    teacher_role = Role(name="teacher")
-    db.add(teacher_role)
-    teacher = User(
-        email="teacher@example.com",
-        first_name="Test",
-        last_name="Teacher",
-        password_hash=get_password_hash("password123"),
+    """Test getting gradebook as teacher."""
+    # Seed rows with bulk INSERTs; the tests never touch them as objects
+    await db.execute(
+        insert(Assignment),
+        [
+            {
+                "course_id": course.id,
+                "title": f"Assignment {i}",
+                "description": f"Description {i}",
+                "max_score": 100,
+            }
+            for i in range(3)
+        ],
     )
-    teacher.roles.append(teacher_role)
-    db.add(teacher)
-    await db.commit()
-
-    # Create course
-    course = Course(
-        title="Test Course",
-        code="TEST101",
-        description="Test course description",
-        owner_id=teacher.id,
+    student_ids = await db.scalars(
+        insert(User).returning(User.id),
+        [
+            {
+                "email": f"student{i}@example.com",
+                "first_name": f"Student{i}",
+                "last_name": "Test",
+                "password_hash": password_hash,
+            }
+            for i in range(3)
+        ],
     )
-    db.add(course)
-    await db.commit()
-
-    # Create assignment
-    assignment = Assignment(
-        course_id=course.id,
-        title="Test Assignment",
-        description="Test description",
-        max_score=100,
+    await db.execute(
+        insert(Enrolment),
+        [
+            {
+                "user_id": student_id,
+                "course_id": course.id,
+                "status": EnrolmentStatus.ACTIVE,
+            }
+            for student_id in student_ids.all()
+        ],
     )
-    db.add(assignment)
     await db.commit()
 
-    # Create student
-    student = User(
-        email="student@example.com",
-        first_name="Test",
-        last_name="Student",
-        password_hash=get_password_hash("password123"),
-    )
-    db.add(student)
-    await db.commit()
+    # Get gradebook
+    with auth_as(teacher) as client, count_queries() as queries:
+        response = await client.get(f"/courses/{course.id}/gradebook")
+    assert response.status_code == 200
+    # User lookup, course check, assignments and rows, independent of size
+    assert len(queries) <= 5
+    data = response.json()
+    assert len(data["assignments"]) == 3
+    assert len(data["rows"]) == 3
+    for row in data["rows"]:
+        assert len(row["scores"]) == 3
+        for score in row["scores"].values():
+            assert score is None
 
-    # Enroll student
-    enrolment = Enrolment(
-        user_id=student.id,
-        course_id=course.id,
-        status=EnrolmentStatus.ACTIVE,
-    )
-    db.add(enrolment)
-    await db.commit()
 
-    # Login as teacher
-    login_response = await async_client.post(
-        "/auth/login",
-        data={"username": "teacher@example.com", "password": "password123"},
-    )
-    access_token = login_response.json()["access_token"]
+@pytest.mark.asyncio
+async def test_get_gradebook_student(
+    auth_as: AuthAs, gradebook: GradebookCtx
+) -> None:
+    """Test getting gradebook as student."""
+    with auth_as(gradebook.student) as client:
+        response = await client.get(gradebook.url)
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["assignments"]) == 1
+    assert len(data["rows"]) == 1
+    assert data["rows"][0]["student_id"] == gradebook.student.id
+    assert len(data["rows"][0]["scores"]) == 1
+    assert data["rows"][0]["scores"][str(gradebook.assignment.id)] is None
 
-    # Update gradebook
+
+@pytest.mark.asyncio
+async def test_update_gradebook(
+    auth_as: AuthAs, gradebook: GradebookCtx
+) -> None:
+    """Test updating gradebook."""
     update_data = {
         "updates": [
             {
-                "student_id": student.id,
-                "assignment_id": assignment.id,
+                "student_id": gradebook.student.id,
+                "assignment_id": gradebook.assignment.id,
                 "score": 85,
             }
         ]
     }
-    response = await async_client.patch(
-        f"/courses/{course.id}/gradebook",
-        json=update_data,
-        headers={"Authorization": f"Bearer {access_token}"},
-    )
+    with auth_as(gradebook.teacher) as client:
+        response = await client.patch(gradebook.url, json=update_data)
     assert response.status_code == 200
 
-    # Verify update
-    response = await async_client.get(
-        f"/courses/{course.id}/gradebook",
-        headers={"Authorization": f"Bearer {access_token}"},
-    )
+    # The stored cells come back in the PATCH response
+    assert response.json() == update_data["updates"]
+
+
+@pytest.mark.asyncio
+async def test_update_gradebook_duplicate_cell(
+    auth_as: AuthAs, gradebook: GradebookCtx
+) -> None:
+    """Test that the last value wins for a repeated cell."""
+    cell = {
+        "student_id": gradebook.student.id,
+        "assignment_id": gradebook.assignment.id,
+    }
+    update_data = {"updates": [{**cell, "score": 70}, {**cell, "score": 85}]}
+    with auth_as(gradebook.teacher) as client:
+        response = await client.patch(gradebook.url, json=update_data)
     assert response.status_code == 200
-    data = response.json()
-    assert len(data["rows"]) == 1
-    assert data["rows"][0]["scores"][str(assignment.id)] == 85
+    assert response.json() == [{**cell, "score": 85}]
 
 
 @pytest.mark.asyncio
 async def test_update_gradebook_student_forbidden(
-    async_client: AsyncClient,
-    db: AsyncSession,
+    auth_as: AuthAs, gradebook: GradebookCtx
 ) -> None:
     """Test that students cannot update gradebook."""
-    # Create teacher role and user
-    teacher_role = Role(name="teacher")
-    db.add(teacher_role)
-    teacher = User(
-        email="teacher@example.com",
-        first_name="Test",
-        last_name="Teacher",
-        password_hash=get_password_hash("password123"),
-    )
-    teacher.roles.append(teacher_role)
-    db.add(teacher)
-    await db.commit()
-
-    # Create course
-    course = Course(
-        title="Test Course",
-        code="TEST101",
-        description="Test course description",
-        owner_id=teacher.id,
-    )
-    db.add(course)
-    await db.commit()
-
-    # Create assignment
-    assignment = Assignment(
-        course_id=course.id,
-        title="Test Assignment",
-        description="Test description",
-        max_score=100,
-    )
-    db.add(assignment)
-    await db.commit()
-
-    # Create student
-    student = User(
-        email="student@example.com",
-        first_name="Test",
-        last_name="Student",
-        password_hash=get_password_hash("password123"),
-    )
-    db.add(student)
-    await db.commit()
-
-    # Enroll student
-    enrolment = Enrolment(
-        user_id=student.id,
-        course_id=course.id,
-        status=EnrolmentStatus.ACTIVE,
-    )
-    db.add(enrolment)
-    await db.commit()
-
-    # Login as student
-    login_response = await async_client.post(
-        "/auth/login",
-        data={"username": "student@example.com", "password": "password123"},
-    )
-    access_token = login_response.json()["access_token"]
-
-    # Try to update gradebook
     update_data = {
         "updates": [
             {
-                "student_id": student.id,
-                "assignment_id": assignment.id,
+                "student_id": gradebook.student.id,
+                "assignment_id": gradebook.assignment.id,
                 "score": 85,
             }
         ]
     }
-    response = await async_client.patch(
-        f"/courses/{course.id}/gradebook",
-        json=update_data,
-        headers={"Authorization": f"Bearer {access_token}"},
-    )
-    assert response.status_code == 403 
\ No newline at end of file
+    with auth_as(gradebook.student) as client:
+        response = await client.patch(gradebook.url, json=update_data)
+    assert response.status_code == 403
@@ -1,144 +1,124 @@
 from __future__ import annotations
 
+import asyncio
 import json
-from typing import AsyncGenerator
+import re
+from dataclasses import dataclass
 
 import pytest
-from fastapi import FastAPI
 from httpx import AsyncClient
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import get_password_hash
+from app.core import rate_limit
+from app.core.redis import get_redis
+from app.core.security import create_access_token
 from app.models.course import Course, Enrolment, EnrolmentStatus
 from app.models.message import Dialog, Message
 from app.models.role import Role
 from app.models.user import User
 
+# Markup that must never survive sanitization
+XSS_MARKERS = re.compile(r"<script|javascript:|\bon\w+=", re.IGNORECASE)
+
+
+async def ws_roundtrip(websocket, payloads: list[dict]) -> list[dict]:
+    """Send payloads over an open socket and collect the echoed items."""
+    for payload in payloads:
+        await websocket.send_json(payload)
+    received: list[dict] = []
+    while len(received) < len(payloads):
+        # The server may coalesce several messages into one frame
+        received.extend(await websocket.receive_json())
+    return received
+
+
+@dataclass
+class Scenario:
+    """A teacher's course with one actively enrolled student."""
+
+    teacher: User
+    student: User
+    course: Course
+    enrolment: Enrolment
+
 
 @pytest.fixture
-async def teacher(db: AsyncSession) -> User:
-    """Create a teacher user."""
-    teacher_role = Role(name="teacher")
-    db.add(teacher_role)
+async def scenario(
+    db: AsyncSession, password_hash: str, roles: dict[str, Role]
+) -> Scenario:
+    """Create the teacher, student, course and enrolment with one commit."""
     teacher = User(
         email="teacher@example.com",
         first_name="Test",
         last_name="Teacher",
-        password_hash=get_password_hash("password123"),
+        password_hash=password_hash,
+        roles=[roles["teacher"]],
     )
-    teacher.roles.append(teacher_role)
-    db.add(teacher)
-    await db.commit()
-    return teacher
-
-
-@pytest.fixture
-async def student(db: AsyncSession) -> User:
-    """Create a student user."""
-    student_role = Role(name="student")
-    db.add(student_role)
     student = User(
         email="student@example.com",
         first_name="Test",
         last_name="Student",
-        password_hash=get_password_hash("password123"),
+        password_hash=password_hash,
+        roles=[roles["student"]],
     )
-    student.roles.append(student_role)
-    db.add(student)
-    await db.commit()
-    return student
-
-
-@pytest.fixture
-async def course(db: AsyncSession, teacher: User) -> Course:
-    """Create a course."""
+    # Relationships let the unit of work order the inserts
     course = Course(
         title="Test Course",
         code="TEST101",
         description="Test course description",
-        owner_id=teacher.id,
+        owner=teacher,
     )
-    db.add(course)
-    await db.commit()
-    return course
-
-
-@pytest.fixture
-async def enrolment(db: AsyncSession, course: Course, student: User) -> Enrolment:
-    """Create an enrolment."""
     enrolment = Enrolment(
-        user_id=student.id,
-        course_id=course.id,
-        status=EnrolmentStatus.ACTIVE,
+        user=student, course=course, status=EnrolmentStatus.ACTIVE
     )
-    db.add(enrolment)
+    db.add_all([teacher, student, course, enrolment])
     await db.commit()
-    return enrolment
+    return Scenario(teacher, student, course, enrolment)
 
 
 @pytest.mark.asyncio
 async def test_create_dialog(
     async_client: AsyncClient,
     db: AsyncSession,
-    teacher: User,
-    student: User,
-    course: Course,
-    enrolment: Enrolment,
+    scenario: Scenario,
 ) -> None:
     """Test creating a dialog."""
-    # Login as teacher
-    login_response = await async_client.post(
-        "/auth/login",
-        data={"username": "teacher@example.com", "password": "password123"},
-    )
-    access_token = login_response.json()["access_token"]
+    # Authenticate as teacher
+    access_token = create_access_token(scenario.teacher.id)
 
     # Create message (this will create dialog)
     message_data = {"body": "Hello student!"}
     response = await async_client.post(
-        f"/courses/{course.id}/messages",
+        f"/courses/{scenario.course.id}/messages",
         json=message_data,
         headers={"Authorization": f"Bearer {access_token}"},
     )
     assert response.status_code == 200
 
-    # Verify dialog was created
-    stmt = select(Dialog).where(
-        Dialog.course_id == course.id,
-        Dialog.teacher_id == teacher.id,
-        Dialog.student_id == student.id,
-    )
-    result = await db.execute(stmt)
-    dialog = result.scalar_one_or_none()
-    assert dialog is not None
+    # The stored message points at the newly created dialog
+    data = response.json()
+    assert data["dialog_id"] is not None
+    assert data["sender_id"] == scenario.teacher.id
 
 
 @pytest.mark.asyncio
 async def test_create_message(
     async_client: AsyncClient,
     db: AsyncSession,
-    teacher: User,
-    student: User,
-    course: Course,
-    enrolment: Enrolment,
+    scenario: Scenario,
 ) -> None:
     """Test creating a message."""
     # Create dialog
     dialog = Dialog(
-        course_id=course.id,
-        teacher_id=teacher.id,
-        student_id=student.id,
+        course_id=scenario.course.id,
+        teacher_id=scenario.teacher.id,
+        student_id=scenario.student.id,
     )
     db.add(dialog)
     await db.commit()
 
-    # Login as teacher
-    login_response = await async_client.post(
-        "/auth/login",
-        data={"username": "teacher@example.com", "password": "password123"},
-    )
-    access_token = login_response.json()["access_token"]
+    # Authenticate as teacher
+    access_token = create_access_token(scenario.teacher.id)
 
     # Create message
     message_data = {"body": "Hello student!"}
@@ -150,47 +130,38 @@ async def test_create_message(
     assert response.status_code == 200
     data = response.json()
     assert data["body"] == "Hello student!"
-    assert data["sender_id"] == teacher.id
+    assert data["sender_id"] == scenario.teacher.id
 
 
 @pytest.mark.asyncio
 async def test_get_messages(
     async_client: AsyncClient,
     db: AsyncSession,
-    teacher: User,
-    student: User,
-    course: Course,
-    enrolment: Enrolment,
+    scenario: Scenario,
 ) -> None:
     """Test getting messages."""
     # Create dialog
     dialog = Dialog(
-        course_id=course.id,
-        teacher_id=teacher.id,
-        student_id=student.id,
+        course_id=scenario.course.id,
+        teacher_id=scenario.teacher.id,
+        student_id=scenario.student.id,
     )
     db.add(dialog)
     await db.commit()
 
     # Create messages
-    messages = [
+    db.add_all(
         Message(
             dialog_id=dialog.id,
-            sender_id=teacher.id,
+            sender_id=scenario.teacher.id,
             body=f"Message {i}",
         )
         for i in range(3)
-    ]
-    for message in messages:
-        db.add(message)
+    )
     await db.commit()
 
-    # Login as teacher
-    login_response = await async_client.post(
-        "/auth/login",
-        data={"username": "teacher@example.com", "password": "password123"},
-    )
-    access_token = login_response.json()["access_token"]
+    # Authenticate as teacher
+    access_token = create_access_token(scenario.teacher.id)
 
     # Get messages
     response = await async_client.get(
@@ -208,67 +179,76 @@ async def test_get_messages(
 async def test_rate_limit(
     async_client: AsyncClient,
     db: AsyncSession,
-    teacher: User,
-    student: User,
-    course: Course,
-    enrolment: Enrolment,
+    scenario: Scenario,
 ) -> None:
     """Test message rate limiting."""
     # Create dialog
     dialog = Dialog(
-        course_id=course.id,
-        teacher_id=teacher.id,
-        student_id=student.id,
+        course_id=scenario.course.id,
+        teacher_id=scenario.teacher.id,
+        student_id=scenario.student.id,
     )
     db.add(dialog)
     await db.commit()
 
-    # Login as teacher
-    login_response = await async_client.post(
-        "/auth/login",
-        data={"username": "teacher@example.com", "password": "password123"},
+    # Authenticate as teacher
+    access_token = create_access_token(scenario.teacher.id)
+
+    # Use up the 5 allowed messages without sending them
+    key = f"message_rate:{scenario.teacher.id}"
+    await rate_limit.hit_many([key] * 5, 60)
+
+    # The 6th message should be rejected
+    response = await async_client.post(
+        f"/dialogs/{dialog.id}/messages",
+        json={"body": "Message 5"},
+        headers={"Authorization": f"Bearer {access_token}"},
     )
-    access_token = login_response.json()["access_token"]
-
-    # Send 6 messages (should fail on 6th)
-    for i in range(6):
-        message_data = {"body": f"Message {i}"}
-        response = await async_client.post(
-            f"/dialogs/{dialog.id}/messages",
-            json=message_data,
-            headers={"Authorization": f"Bearer {access_token}"},
-        )
-        if i < 5:
-            assert response.status_code == 200
-        else:
-            assert response.status_code == 429
+    assert response.status_code == 429
+
+    # Expire the window instead of waiting it out; sending works again
+    redis = await get_redis()
+    await redis.delete(key)
+    response = await async_client.post(
+        f"/dialogs/{dialog.id}/messages",
+        json={"body": "Message 6"},
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == 200
+    await redis.delete(key)
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_concurrent_hits() -> None:
+    """Test that concurrent hits on one window are each counted once."""
+    # Requests share the test db session, so hammer the limiter directly
+    key = "message_rate:concurrent-test"
+    counts = await asyncio.gather(*(rate_limit.hit(key, 60) for _ in range(6)))
+    redis = await get_redis()
+    await redis.delete(key)
+
+    assert sorted(counts) == [1, 2, 3, 4, 5, 6]
+    assert sum(count > 5 for count in counts) == 1
 
 
 @pytest.mark.asyncio
 async def test_xss_protection(
     async_client: AsyncClient,
     db: AsyncSession,
-    teacher: User,
-    student: User,
-    course: Course,
-    enrolment: Enrolment,
+    scenario: Scenario,
 ) -> None:
     """Test XSS protection in messages."""
     # Create dialog
     dialog = Dialog(
-        course_id=course.id,
-        teacher_id=teacher.id,
-        student_id=student.id,
+        course_id=scenario.course.id,
+        teacher_id=scenario.teacher.id,
+        student_id=scenario.student.id,
     )
     db.add(dialog)
     await db.commit()
 
-    # Login as teacher
-    login_response = await async_client.post(
-        "/auth/login",
-        data={"username": "teacher@example.com", "password": "password123"},
-    )
-    access_token = login_response.json()["access_token"]
+    # Authenticate as teacher
+    access_token = create_access_token(scenario.teacher.id)
 
     # Create message with XSS attempt
     message_data = {
@@ -281,8 +261,7 @@ async def test_xss_protection(
     )
     assert response.status_code == 200
     data = response.json()
-    assert "<script>" not in data["body"]
-    assert "javascript:" not in data["body"]
+    assert not XSS_MARKERS.search(data["body"])
     assert "<p>Safe text</p>" in data["body"]
 
 
@@ -290,44 +269,32 @@ async def test_xss_protection(
 async def test_websocket_chat(
     async_client: AsyncClient,
     db: AsyncSession,
-    teacher: User,
-    student: User,
-    course: Course,
-    enrolment: Enrolment,
+    scenario: Scenario,
 ) -> None:
     """Test WebSocket chat."""
     # Create dialog
     dialog = Dialog(
-        course_id=course.id,
-        teacher_id=teacher.id,
-        student_id=student.id,
+        course_id=scenario.course.id,
+        teacher_id=scenario.teacher.id,
+        student_id=scenario.student.id,
     )
     db.add(dialog)
     await db.commit()
 
-    # Login as teacher
-    login_response = await async_client.post(
-        "/auth/login",
-        data={"username": "teacher@example.com", "password": "password123"},
-    )
-    access_token = login_response.json()["access_token"]
+    # Authenticate as teacher
+    access_token = create_access_token(scenario.teacher.id)
 
     # Connect to WebSocket
     async with async_client.websocket_connect(
         f"/ws/chat/{dialog.id}?token={access_token}"
     ) as websocket:
-        # Send message
-        message_data = {"body": "Hello via WebSocket!"}
-        await websocket.send_json(message_data)
-
-        # Receive message
-        response = await websocket.receive_json()
-        assert response["body"] == "Hello via WebSocket!"
-        assert response["sender_id"] == teacher.id
-
-        # Verify message was saved
-        stmt = select(Message).where(Message.dialog_id == dialog.id)
-        result = await db.execute(stmt)
-        message = result.scalar_one_or_none()
-        assert message is not None
-        assert message.body == "Hello via WebSocket!" 
\ No newline at end of file
+        # Send several messages over the one handshake
+        payloads = [{"body": f"Hello via WebSocket {i}!"} for i in range(3)]
+        echoed = await ws_roundtrip(websocket, payloads)
+
+    # Each message is echoed, in order, only once it has been saved
+    assert [m["body"] for m in echoed] == [p["body"] for p in payloads]
+    for message in echoed:
+        assert message["id"] is not None
+        assert message["dialog_id"] == dialog.id
+        assert message["sender_id"] == scenario.teacher.id
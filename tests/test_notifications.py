@@ -1,83 +1,16 @@
 from __future__ import annotations
 
 import json
-from typing import AsyncGenerator
 
 import pytest
-from fastapi import FastAPI
 from httpx import AsyncClient
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import get_password_hash
-from app.models.course import Course, Enrolment, EnrolmentStatus
-from app.models.message import Dialog, Message
+from app.core.security import create_access_token
 from app.models.notification import Notification, NotificationType
-from app.models.role import Role
 from app.models.user import User
 
 
-@pytest.fixture
-async def teacher(db: AsyncSession) -> User:
-    """Create a teacher user."""
-    teacher_role = Role(name="teacher")
-    db.add(teacher_role)
-    teacher = User(
-        email="teacher@example.com",
-        first_name="Test",
-        last_name="Teacher",
-        password_hash=get_password_hash("password123"),
-    )
-    teacher.roles.append(teacher_role)
-    db.add(teacher)
-    await db.commit()
-    return teacher
-
-
-@pytest.fixture
-async def student(db: AsyncSession) -> User:
-    """Create a student user."""
-    student_role = Role(name="student")
-    db.add(student_role)
-    student = User(
-        email="student@example.com",
-        first_name="Test",
-        last_name="Student",
-        password_hash=get_password_hash("password123"),
-    )
-    student.roles.append(student_role)
-    db.add(student)
-    await db.commit()
-    return student
-
-
-@pytest.fixture
-async def course(db: AsyncSession, teacher: User) -> Course:
-    """Create a course."""
-    course = Course(
-        title="Test Course",
-        code="TEST101",
-        description="Test course description",
-        owner_id=teacher.id,
-    )
-    db.add(course)
-    await db.commit()
-    return course
-
-
-@pytest.fixture
-async def enrolment(db: AsyncSession, course: Course, student: User) -> Enrolment:
-    """Create an enrolment."""
-    enrolment = Enrolment(
-        user_id=student.id,
-        course_id=course.id,
-        status=EnrolmentStatus.ACTIVE,
-    )
-    db.add(enrolment)
-    await db.commit()
-    return enrolment
-
-
 @pytest.mark.asyncio
 async def test_get_notifications(
     async_client: AsyncClient,
@@ -99,16 +32,11 @@ async def test_get_notifications(
             payload={"dialog_id": 1, "sender_id": teacher.id, "message_id": 1},
         ),
     ]
-    for notification in notifications:
-        db.add(notification)
+    db.add_all(notifications)
     await db.commit()
 
-    # Login as student
-    login_response = await async_client.post(
-        "/auth/login",
-        data={"username": "student@example.com", "password": "password123"},
-    )
-    access_token = login_response.json()["access_token"]
+    # Authenticate as student
+    access_token = create_access_token(student.id)
 
     # Get notifications
     response = await async_client.get(
@@ -139,12 +67,8 @@ async def test_update_notification(
     db.add(notification)
     await db.commit()
 
-    # Login as student
-    login_response = await async_client.post(
-        "/auth/login",
-        data={"username": "student@example.com", "password": "password123"},
-    )
-    access_token = login_response.json()["access_token"]
+    # Authenticate as student
+    access_token = create_access_token(student.id)
 
     # Update notification
     update_data = {"delivered": True}
@@ -175,12 +99,8 @@ async def test_update_foreign_notification(
     db.add(notification)
     await db.commit()
 
-    # Login as teacher
-    login_response = await async_client.post(
-        "/auth/login",
-        data={"username": "teacher@example.com", "password": "password123"},
-    )
-    access_token = login_response.json()["access_token"]
+    # Authenticate as teacher
+    access_token = create_access_token(teacher.id)
 
     # Try to update notification
     update_data = {"delivered": True}
@@ -200,12 +120,8 @@ async def test_websocket_notifications(
     student: User,
 ) -> None:
     """Test WebSocket notifications."""
-    # Login as student
-    login_response = await async_client.post(
-        "/auth/login",
-        data={"username": "student@example.com", "password": "password123"},
-    )
-    access_token = login_response.json()["access_token"]
+    # Authenticate as student
+    access_token = create_access_token(student.id)
 
     # Connect to WebSocket
     async with async_client.websocket_connect(
@@ -225,5 +141,5 @@ async def test_websocket_notifications(
 
         # Receive notification
         response = await websocket.receive_json()
-        assert response["type"] == "new_grade"
-        assert response["payload"]["score"] == 85 
\ No newline at end of file
+        assert response[0]["type"] == "new_grade"
+        assert response[0]["payload"]["score"] == 85 
\ No newline at end of file